@@ -0,0 +1,2 @@
+# Benchmarks for the report generation pipeline
+# Run with: python -m benchmarks.run --help (from the backend directory)
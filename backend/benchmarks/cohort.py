@@ -0,0 +1,88 @@
+# cohort.py
+# Synthetic subject and student info workbooks for benchmarking
+
+import random
+from io import BytesIO
+from typing import List, Tuple
+
+import pandas as pd
+
+FIRST_NAMES = ['Mohammed', 'Syed', 'Ayesha', 'Fatima', 'Rahul', 'Priya', 'Arjun', 'Sana', 'Imran', 'Kavya', 'Abdul', 'Zainab', 'Rohan', 'Meera', 'Faisal', 'Nikhil']
+LAST_NAMES = ['Khan', 'Reddy', 'Ahmed', 'Sharma', 'Hussain', 'Rao', 'Begum', 'Naidu', 'Siddiqui', 'Kumar', 'Ali', 'Varma']
+THEORY_SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Data Structures', 'Digital Electronics', 'Operating Systems', 'Computer Networks', 'Database Systems', 'Discrete Mathematics', 'Software Engineering']
+LAB_SUBJECTS = ['Physics Lab', 'Chemistry Lab', 'Programming Lab', 'Electronics Lab', 'Networks Lab', 'Database Lab']
+
+# Roll numbers look like 1609-23-733-001: college, year, branch, serial
+ROLL_PREFIX = 160923733000
+
+
+def _subject_names(pool: List[str], count: int) -> List[str]:
+    """First count names from pool, numbered once the pool runs out"""
+    return [pool[i] if i < len(pool) else f"{pool[i % len(pool)]} {i // len(pool) + 1}" for i in range(count)]
+
+
+def _to_excel(df: pd.DataFrame) -> bytes:
+    buffer = BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def make_cohort(students: int, theory_subjects: int = 5, lab_subjects: int = 2, seed: int = 0, absent_rate: float = 0.03, backlog_rate: float = 0.2, semester: int = 4) -> Tuple[List[Tuple[str, bytes]], bytes]:
+    """Build Excel workbooks for a synthetic cohort.
+
+    Uses the header spellings faculty actually upload (e.g. "Roll No",
+    "DT Marks", "Classes Attended") so ingest exercises column mapping.
+    About absent_rate of marks are 'AB', and about backlog_rate of students
+    have backlogs in earlier semesters.
+
+    Returns:
+        Tuple of ([(filename, xlsx_bytes) per subject], student_info_xlsx_bytes),
+        ready for process_subject_files / process_backlog_file
+    """
+    rng = random.Random(seed)
+    rolls = [ROLL_PREFIX + i + 1 for i in range(students)]
+
+    def marks(maximum: int):
+        return 'AB' if rng.random() < absent_rate else rng.randint(maximum // 4, maximum)
+
+    subject_files = []
+    for subject in _subject_names(THEORY_SUBJECTS, theory_subjects):
+        conducted = rng.randint(30, 50)
+        rows = []
+        for roll in rolls:
+            dt, st, at = marks(20), marks(10), marks(10)
+            total = sum(m for m in (dt, st, at) if m != 'AB')
+            rows.append({
+                'Roll No': roll,
+                'DT Marks': dt,
+                'ST Marks': st,
+                'AT Marks': at,
+                'Total Marks': total,
+                'Classes Conducted': conducted,
+                'Classes Attended': rng.randint(conducted // 2, conducted),
+            })
+        subject_files.append((f"{subject}.xlsx", _to_excel(pd.DataFrame(rows))))
+
+    for subject in _subject_names(LAB_SUBJECTS, lab_subjects):
+        conducted = rng.randint(10, 16)
+        rows = [{
+            'Roll No': roll,
+            'Classes Conducted': conducted,
+            'Classes Attended': rng.randint(conducted // 2, conducted),
+            'Lab Marks': marks(25),
+        } for roll in rolls]
+        subject_files.append((f"{subject}.xlsx", _to_excel(pd.DataFrame(rows))))
+
+    info_rows = []
+    for roll in rolls:
+        row = {
+            'Roll No': roll,
+            'Student Name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'Father Name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        }
+        has_backlogs = rng.random() < backlog_rate
+        for sem in range(1, semester):
+            row[f'Sem {sem}'] = rng.randint(1, 3) if has_backlogs and rng.random() < 0.5 else 0
+        info_rows.append(row)
+
+    return subject_files, _to_excel(pd.DataFrame(info_rows))
@@ -0,0 +1,175 @@
+# run.py
+# Times each stage of the report pipeline on synthetic cohorts and writes the results to JSON
+#
+# Usage (from the backend directory):
+#   python -m benchmarks.run --students 50 200 1000 --theory 5 --labs 2 --output benchmark_results.json
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import zipfile
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Callable, Dict, List
+
+from benchmarks.cohort import make_cohort
+from services import process_subject_files, process_backlog_file
+from services.html_renderer import render_report_html
+from services.report_generator import (
+    get_student_complete_data,
+    create_comprehensive_student_report,
+    create_consolidated_all_students_report,
+    create_consolidated_report_from_layouts
+)
+from services.report_layout import build_report_layout
+
+REPORT_ARGS = {
+    "department_name": "Computer Science",
+    "report_date": "01.01.2025",
+    "academic_year": "2024-2025",
+    "semester": "B.E- IV Semester",
+    "attendance_start": "01.08.2024",
+    "attendance_end": "30.09.2024",
+    "template": "Detailed",
+    "include_backlog": True,
+    "include_notes": True,
+}
+
+
+def _summarize(samples: List[float]) -> Dict[str, Any]:
+    """Total and per-item statistics (milliseconds) for a list of durations in seconds"""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "total_s": round(sum(ordered), 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _timed(func: Callable[[], Any]):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _docx_bytes(doc) -> bytes:
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def run_cohort(students: int, theory: int, labs: int, seed: int, preview_sample: int) -> Dict[str, Any]:
+    """Benchmark every pipeline stage for one synthetic cohort"""
+    subject_files, info_file = make_cohort(students, theory, labs, seed=seed)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    (ingested, ingest_time) = _timed(lambda: (process_subject_files(subject_files), process_backlog_file(info_file)))
+    (subjects_data, all_students, error), (backlog_data, backlog_error) = ingested
+    if error or backlog_error:
+        raise RuntimeError(error or backlog_error)
+    stages["ingest"] = _summarize([ingest_time])
+
+    lookups, lookup_times = [], []
+    for roll in all_students:
+        data, elapsed = _timed(lambda: get_student_complete_data(roll, subjects_data, backlog_data))
+        lookups.append(data)
+        lookup_times.append(elapsed)
+    stages["lookup"] = _summarize(lookup_times)
+
+    layouts, layout_times = [], []
+    for data in lookups:
+        layout, elapsed = _timed(lambda: build_report_layout(data, **REPORT_ARGS, backlog_data=backlog_data))
+        layouts.append(layout)
+        layout_times.append(elapsed)
+    stages["layout"] = _summarize(layout_times)
+
+    reports, render_times = {}, []
+    for roll, data in zip(all_students, lookups):
+        content, elapsed = _timed(lambda: _docx_bytes(create_comprehensive_student_report(data, **REPORT_ARGS, backlog_data=backlog_data)))
+        reports[f"{roll}_Report.docx"] = content
+        render_times.append(elapsed)
+    stages["render_docx"] = _summarize(render_times)
+
+    html_times = [_timed(lambda: render_report_html(layout))[1] for layout in layouts]
+    stages["render_html"] = _summarize(html_times)
+
+    # Consolidated document, end to end and from already-built layouts
+    consolidated, elapsed = _timed(lambda: _docx_bytes(create_consolidated_all_students_report(
+        all_students, subjects_data, **REPORT_ARGS, backlog_data=backlog_data
+    )))
+    stages["consolidated"] = _summarize([elapsed])
+
+    _, elapsed = _timed(lambda: _docx_bytes(create_consolidated_report_from_layouts(layouts)))
+    stages["consolidated_from_layouts"] = _summarize([elapsed])
+
+    def build_zip():
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for filename, content in reports.items():
+                zip_file.writestr(filename, content)
+            zip_file.writestr("Consolidated_Progress_Report.docx", consolidated)
+        return buffer.getvalue()
+    zip_bytes, elapsed = _timed(build_zip)
+    stages["zip"] = _summarize([elapsed])
+
+    # mammoth DOCX -> HTML conversion (the source=docx preview path) on a sample
+    try:
+        import mammoth
+    except ImportError:
+        mammoth = None
+    if mammoth is not None and preview_sample > 0:
+        sample = list(reports.values())[:preview_sample]
+        stages["preview_mammoth"] = _summarize([
+            _timed(lambda: mammoth.convert_to_html(BytesIO(content)))[1] for content in sample
+        ])
+
+    return {
+        "students": len(all_students),
+        "theory_subjects": theory,
+        "lab_subjects": labs,
+        "sizes": {
+            "subject_files_bytes": sum(len(content) for _, content in subject_files),
+            "report_mean_bytes": round(statistics.fmean(len(c) for c in reports.values())) if reports else 0,
+            "consolidated_bytes": len(consolidated),
+            "zip_bytes": len(zip_bytes),
+        },
+        "stages": stages,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark report generation on synthetic cohorts")
+    parser.add_argument("--students", type=int, nargs="+", default=[50, 200], help="Cohort sizes to run")
+    parser.add_argument("--theory", type=int, default=5, help="Theory subjects per cohort")
+    parser.add_argument("--labs", type=int, default=2, help="Lab subjects per cohort")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--preview-sample", type=int, default=10, help="Reports converted with mammoth per cohort")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write")
+    args = parser.parse_args(argv)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cohorts": [],
+    }
+    for students in args.students:
+        cohort = run_cohort(students, args.theory, args.labs, args.seed, args.preview_sample)
+        results["cohorts"].append(cohort)
+        summary = ", ".join(f"{name} {stage['total_s']:.2f}s" for name, stage in cohort["stages"].items())
+        print(f"{students} students: {summary}", file=sys.stderr)
+
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+# startup.py
+# Measures cold start in fresh interpreters: app import time by package and the first
+# ingest/render/preview with and without warm-up, checked against a target
+#
+# Usage (from the backend directory):
+#   python -m benchmarks.startup --target 1.5 --output startup_results.json
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from io import BytesIO
+from typing import Dict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds from interpreter start to an importable app, for serverless cold starts
+DEFAULT_TARGET = 1.5
+
+# Name of the student info workbook among the cohort files passed to a child
+INFO_FILENAME = "Student_Info.xlsx"
+
+
+def _write_cohort(data_dir: str):
+    """One-student cohort as Excel files, written by the parent so children start without openpyxl loaded"""
+    from benchmarks.cohort import make_cohort
+    subject_files, info_file = make_cohort(1, seed=0)
+    for filename, content in subject_files + [(INFO_FILENAME, info_file)]:
+        with open(os.path.join(data_dir, filename), "wb") as excel_file:
+            excel_file.write(content)
+
+
+def import_breakdown() -> Dict[str, float]:
+    """Self import time (ms) of the top-level packages main loads, from python -X importtime.
+
+    importtime itself slows imports down, so these are for comparing packages;
+    the wall-clock import time comes from first_requests.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    packages: Dict[str, int] = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[12:]:
+            continue
+        _, self_us, name = line[12:].split("|")
+        if not self_us.strip().isdigit():
+            continue  # column header
+        packages[name.strip().split(".")[0]] += int(self_us)
+    top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {name: round(us / 1000, 1) for name, us in top}
+
+
+def _first_requests(warm: bool, data_dir: str) -> Dict[str, float]:
+    """Run in a child process: import the app, optionally warm up, then time the first operations"""
+    timings = {}
+    start = time.perf_counter()
+    import main  # noqa: F401
+    timings["import_s"] = time.perf_counter() - start
+
+    if warm:
+        from services.warmup import warm_up
+        start = time.perf_counter()
+        warm_up()
+        timings["warm_up_s"] = time.perf_counter() - start
+
+    from services import process_subject_files, process_backlog_file
+    from services.html_renderer import render_report_html
+    from services.report_generator import get_student_complete_data, create_comprehensive_student_report
+    from services.report_layout import build_report_layout
+    from benchmarks.run import REPORT_ARGS
+
+    subject_files = []
+    for filename in sorted(os.listdir(data_dir)):
+        with open(os.path.join(data_dir, filename), "rb") as excel_file:
+            subject_files.append((filename, excel_file.read()))
+    info_file = dict(subject_files).pop(INFO_FILENAME)
+    subject_files = [(name, content) for name, content in subject_files if name != INFO_FILENAME]
+    start = time.perf_counter()
+    subjects_data, all_students, _ = process_subject_files(subject_files)
+    backlog_data, _ = process_backlog_file(info_file)
+    timings["first_ingest_s"] = time.perf_counter() - start
+
+    data = get_student_complete_data(all_students[0], subjects_data, backlog_data)
+    start = time.perf_counter()
+    doc = create_comprehensive_student_report(data, **REPORT_ARGS, backlog_data=backlog_data)
+    buffer = BytesIO()
+    doc.save(buffer)
+    timings["first_render_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    render_report_html(build_report_layout(data, **REPORT_ARGS, backlog_data=backlog_data))
+    timings["first_html_preview_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    import mammoth
+    mammoth.convert_to_html(BytesIO(buffer.getvalue()))
+    timings["first_docx_preview_s"] = time.perf_counter() - start
+    return {name: round(seconds, 3) for name, seconds in timings.items()}
+
+
+def first_requests(warm: bool, data_dir: str) -> Dict[str, float]:
+    """Time import and first operations in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", "warm" if warm else "cold", "--data", data_dir],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure backend cold start")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET, help="Maximum app import time in seconds")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per measurement (best is reported)")
+    parser.add_argument("--output", default=None, help="JSON file to write")
+    parser.add_argument("--child", choices=["cold", "warm"], help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_first_requests(args.child == "warm", args.data)))
+        return 0
+
+    packages = import_breakdown()
+    with tempfile.TemporaryDirectory() as data_dir:
+        _write_cohort(data_dir)
+        cold = min((first_requests(False, data_dir) for _ in range(args.runs)), key=lambda run: run["import_s"])
+        warm = min((first_requests(True, data_dir) for _ in range(args.runs)), key=lambda run: run["import_s"])
+    import_s = min(cold["import_s"], warm["import_s"])
+    results = {"target_s": args.target, "import_s": import_s, "packages_ms": packages, "cold": cold, "warm": warm}
+
+    print(f"import main: {import_s:.3f}s (target {args.target:.1f}s)", file=sys.stderr)
+    print("  self time under -X importtime: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in packages.items()), file=sys.stderr)
+    for label, run in (("cold", cold), ("warm", warm)):
+        print(f"{label}: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in run.items()), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if import_s > args.target:
+        print(f"Import time is over the {args.target:.1f}s cold-start target", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,497 @@
+"""
+Command-line report generation, without the web UI
+
+Usage (from the backend directory):
+    python cli.py generate SUBJECT_DIR --student-info Student_Info.xlsx --config config.json --output reports/ --zip reports.zip
+    python cli.py watch SUBJECT_DIR --student-info Student_Info.xlsx --config config.json --output reports/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import sys
+import time
+import zipfile
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from services import ReportConfig, canonical_roll, process_subject_files, process_backlog_file
+from services.change_log import changed_rolls
+from services.renderer_pool import RendererPool
+from services.report_generator import (
+    create_consolidated_report_from_files,
+    create_consolidated_report_from_layouts,
+    get_student_complete_data,
+    report_filename
+)
+from services.report_layout import build_report_layout
+from services.student_table import build_student_table, table_student_data
+from services.validation import validate_dataset
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+# Roll number column names accepted in the student info workbook
+INFO_ROLL_COLUMNS = ('roll_no', 'roll no', 'rollno')
+
+# File name of the consolidated report kept up to date by watch
+WATCH_CONSOLIDATED = "Consolidated_Progress_Report.docx"
+
+# Workbooks are hashed in chunks of this size rather than read whole
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+class CliError(Exception):
+    """Bad input: reported without a traceback, exit status 2"""
+
+
+def load_config(path: Optional[str], report_date: Optional[str]) -> ReportConfig:
+    """ReportConfig from a JSON file with the same fields as POST /api/reports/generate"""
+    fields = {}
+    if path:
+        try:
+            with open(path) as config_file:
+                fields = json.load(config_file)
+        except (OSError, ValueError) as e:
+            raise CliError(f"Cannot read config {path}: {e}")
+    if report_date:
+        fields["report_date"] = report_date
+    try:
+        config = ReportConfig(**fields)
+    except ValidationError as e:
+        raise CliError(f"Invalid config {path}: {e}")
+    if not config.report_date:
+        config.report_date = datetime.now().strftime('%d.%m.%Y')
+    return config
+
+
+def read_workbooks(subject_dir: str, student_info: Optional[str]) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+    """Paths of the subject workbooks in subject_dir (skipping the student info file) and of the student info.
+
+    Workbooks are parsed straight from disk rather than read into memory first.
+    """
+    if not os.path.isdir(subject_dir):
+        raise CliError(f"Not a directory: {subject_dir}")
+    info_path = os.path.abspath(student_info) if student_info else None
+    subject_files = []
+    for filename in sorted(os.listdir(subject_dir)):
+        path = os.path.join(subject_dir, filename)
+        if not filename.endswith(EXCEL_EXTENSIONS) or filename.startswith('~$') or os.path.abspath(path) == info_path:
+            continue
+        subject_files.append((filename, path))
+    if not subject_files:
+        raise CliError(f"No Excel workbooks in {subject_dir}")
+
+    if info_path and not os.path.isfile(info_path):
+        raise CliError(f"Cannot read student info {student_info}: no such file")
+    return subject_files, info_path
+
+
+def print_validation(report: Dict) -> None:
+    """Warn about each data check that found rows; generation goes ahead regardless"""
+    for subject, issues in report["subjects"].items():
+        for check, found in issues.items():
+            rolls = ", ".join(str(row["roll_no"]) for row in found["rows"][:5])
+            more = f" and {found['count'] - 5} more" if found["count"] > 5 else ""
+            print(f"  warning: {subject}: {check.replace('_', ' ')} ({rolls}{more})", file=sys.stderr)
+
+
+def _config_args(config: ReportConfig) -> tuple:
+    return (
+        config.department_name,
+        config.report_date,
+        config.academic_year,
+        config.semester,
+        config.attendance_start,
+        config.attendance_end,
+        config.template,
+        config.include_backlog,
+        config.include_notes
+    )
+
+
+def generate(args) -> int:
+    config = load_config(args.config, args.report_date)
+    subject_files, info_path = read_workbooks(args.subject_dir, args.student_info)
+    os.makedirs(args.output, exist_ok=True)
+    stats: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    subjects_data, all_students, error = process_subject_files(subject_files)
+    if error:
+        raise CliError(error)
+    backlog_data = None
+    if info_path is not None:
+        backlog_data, error = process_backlog_file(info_path)
+        if error:
+            raise CliError(error)
+    stats["ingest_s"] = time.perf_counter() - start
+    print_validation(validate_dataset(subjects_data, backlog_data))
+
+    students = config.students or all_students
+    student_table = build_student_table(subjects_data, backlog_data)
+    pool = RendererPool(args.workers)
+    start = time.perf_counter()
+    try:
+        pool.start()
+        stats["pool_start_s"] = time.perf_counter() - start
+
+        # Layouts are built here, where the data is; workers only render them
+        start = time.perf_counter()
+        failures: Dict[str, str] = {}
+        skipped: List[str] = []
+        pending = []
+        layouts = []
+        for student_roll in students:
+            try:
+                student_complete_data = table_student_data(student_table, student_roll)
+                if not student_complete_data['subjects']:
+                    skipped.append(str(student_roll))
+                    continue
+                layout = build_report_layout(student_complete_data, *_config_args(config), backlog_data)
+            except Exception as e:
+                failures[str(student_roll)] = str(e)
+                continue
+            filename = report_filename(student_roll, student_complete_data['personal_info']['student_name'])
+            layouts.append(layout)
+            pending.append((student_roll, filename, pool.submit(layout)))
+
+        # The consolidated report is built here while the workers render
+        consolidated_name = None
+        consolidated_bytes = None
+        if not args.no_consolidated and layouts:
+            consolidated_name = f"Consolidated_Progress_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+            try:
+                consolidated_path = os.path.join(args.output, consolidated_name)
+                create_consolidated_report_from_layouts(layouts).save(consolidated_path)
+                with open(consolidated_path, 'rb') as consolidated:
+                    consolidated_bytes = consolidated.read()
+            except Exception as e:
+                failures["consolidated"] = str(e)
+                consolidated_name = None
+
+        written: List[Tuple[str, bytes]] = []
+        for student_roll, filename, future in pending:
+            try:
+                content = future.result()
+                with open(os.path.join(args.output, filename), 'wb') as report:
+                    report.write(content)
+            except Exception as e:
+                failures[str(student_roll)] = str(e)
+                continue
+            written.append((filename, content))
+        stats["render_s"] = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    if args.zip:
+        start = time.perf_counter()
+        with zipfile.ZipFile(args.zip, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for filename, content in written:
+                zip_file.writestr(filename, content)
+            if consolidated_bytes is not None:
+                zip_file.writestr(consolidated_name, consolidated_bytes)
+        stats["zip_s"] = time.perf_counter() - start
+
+    total_bytes = sum(len(content) for _, content in written)
+    print(
+        f"{len(written)} reports for {len(students)} students in {stats['render_s']:.2f}s "
+        f"({len(written) / stats['render_s'] if stats['render_s'] else 0:.1f} reports/s, "
+        f"{total_bytes / 1048576:.1f} MB, {max(pool.workers, 1)} workers)",
+        file=sys.stderr
+    )
+    print("  " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stats.items()), file=sys.stderr)
+    if consolidated_name:
+        print(f"  consolidated: {consolidated_name}", file=sys.stderr)
+    if skipped:
+        print(f"  skipped (no subject data): {', '.join(skipped)}", file=sys.stderr)
+    for student_roll, message in failures.items():
+        print(f"  FAILED {student_roll}: {message}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def _write_atomically(path: str, content: bytes):
+    """Replace path in one step, so a report being opened is never half written"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as output:
+        output.write(content)
+    os.replace(temp_path, path)
+
+
+def _file_digest(path: str) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as workbook:
+            for chunk in iter(lambda: workbook.read(DIGEST_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class ReportFolder:
+    """Keeps an output folder of reports in step with a folder of workbooks.
+
+    Only workbooks whose content changed are read again, only students whose
+    rows changed in them are re-rendered, and the consolidated report is
+    reassembled from the individual reports without rendering them again.
+    """
+
+    def __init__(self, subject_dir: str, student_info: Optional[str], config: ReportConfig, output: str, pool: RendererPool, consolidated: bool = True):
+        self.subject_dir = subject_dir
+        self.student_info = os.path.abspath(student_info) if student_info else None
+        self.config = config
+        # Canonical roll numbers of config.students, or None for everyone
+        self.selected = {canonical_roll(roll) for roll in config.students} if config.students else None
+        self.output = output
+        self.pool = pool
+        self.consolidated = consolidated
+        self.subjects_data: Dict[str, object] = {}
+        self.backlog_data = None
+        # Roll number -> (file name, DOCX bytes) of the report in the output folder
+        self.reports: Dict[str, Tuple[str, bytes]] = {}
+        # Path -> ((mtime, size), content hash) of every workbook as last ingested
+        self._ingested: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        # Path -> (mtime, size) at the previous poll, to wait until a copy has finished
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        # Path -> (mtime, size) of a workbook that failed to parse, skipped until it changes
+        self._failed: Dict[str, Tuple[int, int]] = {}
+
+    def _workbooks(self) -> Dict[str, Tuple[int, int]]:
+        found = {}
+        for filename in os.listdir(self.subject_dir):
+            path = os.path.abspath(os.path.join(self.subject_dir, filename))
+            if filename.endswith(EXCEL_EXTENSIONS) and not filename.startswith('~$'):
+                stat = os.stat(path)
+                found[path] = (stat.st_mtime_ns, stat.st_size)
+        if self.student_info and os.path.exists(self.student_info):
+            stat = os.stat(self.student_info)
+            found[self.student_info] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def poll(self, settle: bool = True) -> List[str]:
+        """Workbooks added, changed or removed since they were last ingested.
+
+        With settle, a modified file is only reported once its size and
+        modification time match the previous poll, i.e. it is no longer being copied.
+        """
+        current = self._workbooks()
+        changed = []
+        for path, signature in current.items():
+            ingested = self._ingested.get(path)
+            if ingested is not None and ingested[0] == signature:
+                continue
+            if self._failed.get(path) == signature:
+                continue
+            if settle and self._seen.get(path) != signature:
+                continue
+            if ingested is not None and _file_digest(path) == ingested[1]:
+                self._ingested[path] = (signature, ingested[1])  # touched, same content
+                continue
+            changed.append(path)
+        changed += [path for path in self._ingested if path not in current]
+        self._failed = {path: signature for path, signature in self._failed.items() if path in current}
+        self._seen = current
+        return changed
+
+    def ingest(self, paths: List[str]) -> Set[str]:
+        """Read the given workbooks again; returns the roll numbers whose data changed"""
+        affected: Set[str] = set()
+        for path in paths:
+            filename = os.path.basename(path)
+            if not os.path.exists(path):
+                # Removed workbook: its students lose that subject
+                if path == self.student_info:
+                    affected |= changed_rolls(self.backlog_data, None, INFO_ROLL_COLUMNS)
+                    self.backlog_data = None
+                else:
+                    affected |= changed_rolls(self.subjects_data.pop(filename.split('.')[0], None), None)
+                self._ingested.pop(path, None)
+                print(f"{filename} removed", file=sys.stderr)
+                continue
+
+            # Hashed before parsing: if the file changes in between, the next poll sees it again
+            stat = os.stat(path)
+            digest = _file_digest(path)
+            if path == self.student_info:
+                backlog_data, error = process_backlog_file(path)
+                if error:
+                    print(f"{filename}: {error} (keeping the previous version)", file=sys.stderr)
+                    self._failed[path] = (stat.st_mtime_ns, stat.st_size)
+                    continue
+                affected |= changed_rolls(self.backlog_data, backlog_data, INFO_ROLL_COLUMNS)
+                self.backlog_data = backlog_data
+            else:
+                subjects_data, _, error = process_subject_files([(filename, path)])
+                if error:
+                    print(f"{filename}: {error} (keeping the previous version)", file=sys.stderr)
+                    self._failed[path] = (stat.st_mtime_ns, stat.st_size)
+                    continue
+                for subject_name, df in subjects_data.items():
+                    affected |= changed_rolls(self.subjects_data.get(subject_name), df)
+                    self.subjects_data[subject_name] = df
+            self._ingested[path] = ((stat.st_mtime_ns, stat.st_size), digest)
+            self._failed.pop(path, None)
+        return affected
+
+    def student_order(self) -> List[str]:
+        """Selected roll numbers in subject name order, then sheet order (the consolidated page order)"""
+        rolls = {}
+        for subject_name in sorted(self.subjects_data):
+            for roll in self.subjects_data[subject_name]['roll_no'].dropna():
+                if self.selected is None or roll in self.selected:
+                    rolls.setdefault(roll, None)
+        return list(rolls)
+
+    def render(self, rolls: Set[str]) -> Dict[str, str]:
+        """Re-render the given students' reports into the output folder; returns failures"""
+        failures: Dict[str, str] = {}
+        pending = []
+        for roll in rolls:
+            try:
+                student_complete_data = get_student_complete_data(roll, self.subjects_data, self.backlog_data)
+                if not student_complete_data['subjects']:
+                    self._remove(roll)
+                    continue
+                layout = build_report_layout(student_complete_data, *_config_args(self.config), self.backlog_data)
+            except Exception as e:
+                failures[roll] = str(e)
+                continue
+            filename = report_filename(roll, student_complete_data['personal_info']['student_name'])
+            pending.append((roll, filename, self.pool.submit(layout)))
+
+        for roll, filename, future in pending:
+            try:
+                content = future.result()
+                _write_atomically(os.path.join(self.output, filename), content)
+            except Exception as e:
+                failures[roll] = str(e)
+                continue
+            if roll in self.reports and self.reports[roll][0] != filename:
+                self._remove(roll)  # student renamed
+            self.reports[roll] = (filename, content)
+        return failures
+
+    def _remove(self, roll: str):
+        filename, _ = self.reports.pop(roll, (None, None))
+        if filename and os.path.exists(os.path.join(self.output, filename)):
+            os.remove(os.path.join(self.output, filename))
+
+    def refresh_consolidated(self):
+        order = [roll for roll in self.student_order() if roll in self.reports]
+        path = os.path.join(self.output, WATCH_CONSOLIDATED)
+        if not order:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        buffer = BytesIO()
+        create_consolidated_report_from_files([self.reports[roll][1] for roll in order]).save(buffer)
+        _write_atomically(path, buffer.getvalue())
+
+    def update(self, paths: List[str]) -> Dict[str, str]:
+        """Ingest changed workbooks and bring the output folder up to date; returns failures"""
+        start = time.perf_counter()
+        affected = self.ingest(paths)
+        if self.selected is not None:
+            affected &= self.selected
+        ingest_s = time.perf_counter() - start
+        if not affected:
+            print(f"{', '.join(os.path.basename(p) for p in paths)}: no student data changed", file=sys.stderr)
+            return {}
+
+        start = time.perf_counter()
+        failures = self.render(affected)
+        render_s = time.perf_counter() - start
+        start = time.perf_counter()
+        if self.consolidated:
+            try:
+                self.refresh_consolidated()
+            except Exception as e:
+                failures["consolidated"] = str(e)
+        consolidated_s = time.perf_counter() - start
+
+        print(
+            f"{', '.join(os.path.basename(p) for p in paths)}: {len(affected) - len(failures)} of "
+            f"{len(self.student_order())} students re-rendered (ingest {ingest_s:.2f}s, render {render_s:.2f}s, "
+            f"consolidated {consolidated_s:.2f}s)",
+            file=sys.stderr
+        )
+        for roll, message in failures.items():
+            print(f"  FAILED {roll}: {message}", file=sys.stderr)
+        return failures
+
+
+def watch(args) -> int:
+    config = load_config(args.config, args.report_date)
+    if not os.path.isdir(args.subject_dir):
+        raise CliError(f"Not a directory: {args.subject_dir}")
+    os.makedirs(args.output, exist_ok=True)
+
+    pool = RendererPool(args.workers)
+    pool.start()
+    folder = ReportFolder(args.subject_dir, args.student_info, config, args.output, pool, not args.no_consolidated)
+    failures = folder.update(folder.poll(settle=False))
+    if args.once:
+        pool.shutdown()
+        return 1 if failures else 0
+
+    print(f"Watching {args.subject_dir} every {args.interval:g}s (Ctrl+C to stop)", file=sys.stderr)
+    # Stop the same way on SIGTERM (service managers, docker stop)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            time.sleep(args.interval)
+            changed = folder.poll()
+            if changed:
+                folder.update(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="LORDS progress reports from the command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Render every student's report to DOCX files")
+    gen.add_argument("subject_dir", help="Directory of subject workbooks (one per subject)")
+    gen.add_argument("--student-info", help="Student info/backlog workbook")
+    gen.add_argument("--config", help="JSON file with ReportConfig fields (department_name, semester, ...)")
+    gen.add_argument("--report-date", help="Report date, overriding the config (default: today)")
+    gen.add_argument("--output", default="reports", help="Directory for the DOCX files")
+    gen.add_argument("--zip", help="Also write every report to this ZIP file")
+    gen.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Renderer processes (default: all cores; 0 renders in this process)")
+    gen.add_argument("--no-consolidated", action="store_true", help="Skip the consolidated report")
+    gen.set_defaults(handler=generate)
+
+    daemon = commands.add_parser("watch", help="Keep an output folder of reports up to date as workbooks change")
+    daemon.add_argument("subject_dir", help="Directory of subject workbooks to watch")
+    daemon.add_argument("--student-info", help="Student info/backlog workbook (may be inside subject_dir)")
+    daemon.add_argument("--config", help="JSON file with ReportConfig fields (department_name, semester, ...)")
+    daemon.add_argument("--report-date", help="Report date, overriding the config (default: today)")
+    daemon.add_argument("--output", default="reports", help="Directory for the DOCX files")
+    daemon.add_argument("--interval", type=float, default=5.0, help="Seconds between checks for changed workbooks")
+    daemon.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Renderer processes (default: all cores; 0 renders in this process)")
+    daemon.add_argument("--no-consolidated", action="store_true", help="Don't keep a consolidated report")
+    daemon.add_argument("--once", action="store_true", help="Bring the output up to date once and exit")
+    daemon.set_defaults(handler=watch)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except CliError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,18 +3,36 @@ LORDS Institute Progress Report System - FastAPI Backend
 Main application entry point
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 
 from routes import upload, reports, preview
+from services.memory import memory_usage
+from services.metrics import REGISTRY
+from services.renderer_pool import renderer_pool
+from services.warmup import start_warm_up, warm_up_timings, warmed_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load dependencies, render a dummy report and start the renderer pool in
+    # the background; /api/ready turns ready once that has finished
+    start_warm_up()
+    yield
+    renderer_pool.shutdown()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="LORDS Progress Report API",
     description="API for generating institutional progress reports",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for Next.js frontend
@@ -27,8 +45,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Event streams, sent uncompressed: a compressor holds events back until it
+# has a block's worth, i.e. until the end of a generation
+STREAMING_PATHS = {"/api/reports/generate/stream"}
+
+
+class _GZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that passes STREAMING_PATHS through untouched
+    (only recent Starlette versions skip text/event-stream themselves)"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in STREAMING_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress JSON bodies (previews, uploads) larger than ~1 KB
+app.add_middleware(_GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Mount static files for assets (logo, images)
 assets_path = os.path.join(os.path.dirname(__file__), "assets")
 if os.path.exists(assets_path):
@@ -59,5 +97,52 @@ async def health_check():
             "upload": "available",
             "reports": "available",
             "preview": "available"
-        }
+        },
+        "warm_up_ms": warm_up_timings
     }
+
+
+@app.get("/api/ready")
+async def readiness():
+    """Readiness probe: 503 until warm-up has finished and the renderer pool is running"""
+    ready = warmed_up.is_set() and renderer_pool.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "renderer_workers": renderer_pool.workers,
+            "warm_up_ms": warm_up_timings
+        }
+    )
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage timings, bytes produced, cache hit counts and memory use in Prometheus text format"""
+    _memory_usage()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/memory")
+async def memory():
+    """Bytes held by the dataset (subject frames, student info, student table and
+    frames kept for pinned snapshots), the stored reports and the report caches,
+    and the dataset versions still pinned by running generations"""
+    return {**_memory_usage(), "pinned_versions": upload.snapshots.pinned()}
+
+
+def _memory_usage():
+    data = upload.get_uploaded_data()
+    return memory_usage(
+        data["subjects_data"],
+        data["backlog_data"],
+        reports.generated_reports,
+        caches={
+            "rendered_reports": reports.rendered_reports.values(),
+            "report_layouts": reports.report_layouts.values(),
+            "preview_html": reports.preview_html.values(),
+            "converted_previews": reports.converted_previews.values()
+        },
+        student_table=upload.student_table.frame,
+        snapshot_frames=upload.snapshots.pinned_frames()
+    )
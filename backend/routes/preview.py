@@ -2,16 +2,54 @@
 Preview routes for data viewing and editing
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Literal, Optional
+import numpy as np
 import pandas as pd
 
-from routes.upload import get_uploaded_data
-from services import dataframe_to_dict
+from routes.upload import (
+    dataset_lock,
+    get_change_log,
+    get_student_summary,
+    get_student_table,
+    get_uploaded_data,
+    writable_frame
+)
+from services import canonical_roll, dataframe_payload
+from services.change_log import BACKLOG_TABLE, DerivedCache
+from services.prefetch import NeighbourPrefetcher, foreground
+from services.serialization import FastJSONResponse, conditional_json
 
 router = APIRouter()
 
+change_log = get_change_log()
+
+# Preview payloads and row orderings, rebuilt only for the tables/students that changed
+table_payloads = DerivedCache(change_log, scope="table", name="table_payloads")
+student_payloads = DerivedCache(change_log, name="student_payloads")
+
+
+def _warm_student_payload(roll_no: str):
+    student_payloads.get(roll_no, roll_no, lambda: _student_payload(roll_no))
+
+
+# Warms the edit page payloads of the students either side of the one opened
+student_prefetch = NeighbourPrefetcher(_warm_student_payload)
+
+# Rows serialized per subject page
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Columns matched by the free-text search filter
+SEARCH_COLUMNS = ['roll_no', 'student_name']
+
+# Fields of a subject row that can be edited through the preview routes
+EDITABLE_SUBJECT_FIELDS = [
+    'dt_marks', 'st_marks', 'at_marks', 'total_marks',
+    'attendance_conducted', 'attendance_present'
+]
+
 
 class StudentUpdate(BaseModel):
     """Model for updating student data"""
@@ -27,47 +65,165 @@ class BacklogUpdate(BaseModel):
 
 
 @router.get("/subjects")
-async def get_subjects_data():
-    """Get all uploaded subject data"""
+async def get_subjects_data(
+    request: Request,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    columns: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+    search: Optional[str] = None,
+    include_students: bool = True,
+    shape: Literal["records", "columns"] = "records"
+):
+    """Get one page of every uploaded subject.
+    
+    columns is a comma-separated projection; unknown columns and sort keys are
+    ignored for subjects that don't have them. shape="columns" returns one
+    value array per column instead of row dicts.
+    """
     data = get_uploaded_data()
     
     if not data["subjects_data"]:
         raise HTTPException(status_code=404, detail="No subject data uploaded")
     
-    subjects_preview = {}
-    for subject_name, df in data["subjects_data"].items():
-        # Filter out internal columns for display
-        display_cols = [col for col in df.columns if col not in ['is_lab', 'has_original_lab_marks']]
-        is_lab = bool(df['is_lab'].iloc[0]) if 'is_lab' in df.columns and len(df) > 0 else False
-        has_orig_lab = bool(df['has_original_lab_marks'].iloc[0]) if 'has_original_lab_marks' in df.columns and len(df) > 0 else False
+    def build():
+        requested_cols = _parse_columns(columns)
+        subjects_preview = {}
+        for subject_name, df in data["subjects_data"].items():
+            subjects_preview[subject_name] = _subject_page(
+                subject_name, df, page, page_size, requested_cols, sort_by, descending, search, shape
+            )
         
-        if is_lab:
-            # For labs, hide theory marks columns
-            display_cols = [col for col in display_cols if col not in ['dt_marks', 'st_marks', 'at_marks', 'total_marks']]
-            # Also hide lab_marks if the file didn't have a marks column
-            if not has_orig_lab:
-                display_cols = [col for col in display_cols if col not in ['lab_marks']]
-        else:
-            # For theory subjects, hide lab_marks column
-            display_cols = [col for col in display_cols if col not in ['lab_marks']]
+        # Sort: theory subjects first, then labs
+        sorted_subjects = dict(
+            sorted(subjects_preview.items(), key=lambda x: x[1]["is_lab"])
+        )
         
-        subjects_preview[subject_name] = {
-            "records": dataframe_to_dict(df[display_cols]),
-            "columns": display_cols,
-            "row_count": len(df),
-            "is_lab": is_lab
+        response = {
+            "subjects": sorted_subjects,
+            "total_subjects": len(data["subjects_data"]),
+            "total_students": len(data["all_students"]),
+            "dataset_version": change_log.version
         }
+        if include_students:
+            response["all_students"] = data["all_students"]
+        return response
     
-    # Sort: theory subjects first, then labs
-    sorted_subjects = dict(
-        sorted(subjects_preview.items(), key=lambda x: x[1]["is_lab"])
-    )
+    return conditional_json(request, change_log.etag, build)
+
+
+@router.get("/subjects/{subject_name}")
+async def get_subject_page(
+    request: Request,
+    subject_name: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    columns: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    descending: bool = False,
+    search: Optional[str] = None,
+    shape: Literal["records", "columns"] = "records"
+):
+    """Get a sorted, filtered and column-projected page of one subject"""
+    data = get_uploaded_data()
+    
+    if subject_name not in data["subjects_data"]:
+        raise HTTPException(status_code=404, detail=f"Subject {subject_name} not found")
+    
+    df = data["subjects_data"][subject_name]
+    view = _subject_view(subject_name, df)
+    if sort_by and sort_by not in view["columns"]:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by unknown column: {sort_by}")
+    
+    return conditional_json(request, change_log.etag, lambda: {
+        "subject_name": subject_name,
+        **_subject_page(subject_name, df, page, page_size, _parse_columns(columns), sort_by, descending, search, shape),
+        "dataset_version": change_log.version
+    })
+
+
+def _parse_columns(columns: Optional[str]) -> List[str]:
+    """Split a comma-separated column projection"""
+    if not columns:
+        return []
+    return [col.strip() for col in columns.split(',') if col.strip()]
+
+
+def _subject_view(subject_name: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """Cached display columns and lab flag for one subject"""
+    return table_payloads.get(("view", subject_name), subject_name, lambda: _build_subject_view(df))
+
+
+def _build_subject_view(df: pd.DataFrame) -> Dict[str, Any]:
+    """Work out which columns of a subject are shown in the preview"""
+    # Filter out internal columns for display
+    display_cols = [col for col in df.columns if col not in ['is_lab', 'has_original_lab_marks']]
+    is_lab = bool(df['is_lab'].iloc[0]) if 'is_lab' in df.columns and len(df) > 0 else False
+    has_orig_lab = bool(df['has_original_lab_marks'].iloc[0]) if 'has_original_lab_marks' in df.columns and len(df) > 0 else False
+    
+    if is_lab:
+        # For labs, hide theory marks columns
+        display_cols = [col for col in display_cols if col not in ['dt_marks', 'st_marks', 'at_marks', 'total_marks']]
+        # Also hide lab_marks if the file didn't have a marks column
+        if not has_orig_lab:
+            display_cols = [col for col in display_cols if col not in ['lab_marks']]
+    else:
+        # For theory subjects, hide lab_marks column
+        display_cols = [col for col in display_cols if col not in ['lab_marks']]
+    
+    return {"columns": display_cols, "is_lab": is_lab}
+
+
+def _sort_key(series: pd.Series) -> pd.Series:
+    """Sort marks numerically (so 'AB' sorts last) and text case-insensitively"""
+    numeric = pd.to_numeric(series, errors='coerce')
+    if numeric.notna().any():
+        return numeric
+    return series.astype(str).str.lower()
+
+
+def _row_order(df: pd.DataFrame, sort_by: str, descending: bool) -> np.ndarray:
+    """Row positions of df ordered by one column"""
+    key = _sort_key(df[sort_by]).reset_index(drop=True)
+    return key.sort_values(ascending=not descending, na_position='last', kind='stable').index.to_numpy()
+
+
+def _subject_page(subject_name: str, df: pd.DataFrame, page: int, page_size: int, columns: List[str], sort_by: Optional[str], descending: bool, search: Optional[str], shape: str = "records") -> Dict[str, Any]:
+    """Select, order and serialize a single page of rows from one subject"""
+    view = _subject_view(subject_name, df)
+    display_cols = view["columns"]
+    selected_cols = [col for col in columns if col in display_cols] or display_cols
+    
+    if sort_by and sort_by in display_cols:
+        positions = table_payloads.get(
+            ("order", subject_name, sort_by, descending),
+            subject_name,
+            lambda: _row_order(df, sort_by, descending)
+        )
+    else:
+        positions = np.arange(len(df))
+    
+    if search and search.strip():
+        mask = np.zeros(len(df), dtype=bool)
+        for col in SEARCH_COLUMNS:
+            if col in df.columns:
+                mask |= df[col].astype(str).str.contains(search.strip(), case=False, regex=False).to_numpy()
+        positions = positions[mask[positions]]
+    
+    filtered_count = len(positions)
+    start = (page - 1) * page_size
+    page_rows = df.iloc[positions[start:start + page_size]]
     
     return {
-        "subjects": sorted_subjects,
-        "total_subjects": len(data["subjects_data"]),
-        "total_students": len(data["all_students"]),
-        "all_students": data["all_students"]
+        **dataframe_payload(page_rows[selected_cols], shape),
+        "columns": selected_cols,
+        "row_count": len(df),
+        "filtered_count": filtered_count,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": max(1, -(-filtered_count // page_size)),
+        "is_lab": view["is_lab"]
     }
 
 
@@ -79,72 +235,48 @@ async def get_student_data(roll_no: str):
     if not data["subjects_data"]:
         raise HTTPException(status_code=404, detail="No subject data uploaded")
     
-    # Normalize roll_no for comparison (handle both string and int types)
-    roll_no_str = str(roll_no).strip()
+    # Canonicalize like the stored roll numbers (e.g. "1.6092373013e10" from a spreadsheet link)
+    roll_no_str = canonical_roll(roll_no)
+    with foreground():
+        payload = student_payloads.get(roll_no_str, roll_no_str, lambda: _student_payload(roll_no_str))
     
-    # Get student info from backlog data
-    backlog_data = data.get("backlog_data")
-    father_name = ''
-    student_name_from_backlog = ''
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"Student {roll_no} not found in any subject data")
+    
+    # The next click is most likely a neighbouring student
+    student_prefetch.schedule(roll_no_str, data["all_students"])
+    return payload
+
+
+def _student_payload(roll_no: str) -> Optional[Dict[str, Any]]:
+    """Build the preview payload for one student, or None if not found"""
+    # The student's row of the student table, with their info already joined
+    student = get_student_summary(roll_no)
+    if not student['subjects']:
+        return None
     
-    if backlog_data is not None:
-        roll_col = None
-        for col in ['roll_no', 'roll no', 'rollno']:
-            if col in backlog_data.columns:
-                roll_col = col
-                break
-        
-        if roll_col:
-            # Convert column to string for comparison
-            backlog_data_copy = backlog_data.copy()
-            backlog_data_copy[roll_col] = backlog_data_copy[roll_col].astype(str).str.strip()
-            student_backlog = backlog_data_copy[backlog_data_copy[roll_col] == roll_no_str]
-            if not student_backlog.empty:
-                for col in ['father_name', 'father name', 'fathername']:
-                    if col in student_backlog.columns:
-                        val = student_backlog.iloc[0][col]
-                        if pd.notna(val) and str(val).strip():
-                            father_name = str(val).strip()
-                            break
-                for col in ['student_name', 'student name', 'name']:
-                    if col in student_backlog.columns:
-                        val = student_backlog.iloc[0][col]
-                        if pd.notna(val) and str(val).strip():
-                            student_name_from_backlog = str(val).strip()
-                            break
-    
-    # Get subject data
     subjects = []
-    for subject_name, subject_df in data["subjects_data"].items():
-        # Convert roll_no column to string for comparison
-        df_copy = subject_df.copy()
-        df_copy['roll_no'] = df_copy['roll_no'].astype(str).str.strip()
-        student_data = df_copy[df_copy['roll_no'] == roll_no_str]
-        if not student_data.empty:
-            row = student_data.iloc[0]
-            subjects.append({
-                "subject_name": subject_name,
-                "dt_marks": int(row.get('dt_marks', 0) or 0),
-                "st_marks": int(row.get('st_marks', 0) or 0),
-                "at_marks": int(row.get('at_marks', 0) or 0),
-                "total_marks": int(row.get('total_marks', 0) or 0),
-                "lab_marks": int(row.get('lab_marks', 0) or 0),
-                "attendance_conducted": int(row.get('attendance_conducted', 0) or 0),
-                "attendance_present": int(row.get('attendance_present', 0) or 0),
-                "is_lab": bool(row.get('is_lab', False)),
-                "has_original_lab_marks": bool(row.get('has_original_lab_marks', False))
-            })
-    
-    if not subjects:
-        raise HTTPException(status_code=404, detail=f"Student {roll_no} not found in any subject data")
+    for subject in student['subjects']:
+        subjects.append({
+            "subject_name": subject['subject_name'],
+            "dt_marks": int(subject['dt_marks'] or 0),
+            "st_marks": int(subject['st_marks'] or 0),
+            "at_marks": int(subject['at_marks'] or 0),
+            "total_marks": int(subject['total_marks'] or 0),
+            "lab_marks": int(subject['lab_marks'] or 0),
+            "attendance_conducted": int(subject['attendance_conducted'] or 0),
+            "attendance_present": int(subject['attendance_present'] or 0),
+            "is_lab": bool(subject['is_lab']),
+            "has_original_lab_marks": bool(subject['has_original_lab_marks'])
+        })
     
     # Sort: theory subjects first, then labs
     subjects.sort(key=lambda s: s["is_lab"])
     
     return {
         "roll_no": roll_no,
-        "student_name": student_name_from_backlog or f"Student {roll_no}",
-        "father_name": father_name,
+        "student_name": student['personal_info']['student_name'],
+        "father_name": student['personal_info']['father_name'],
         "subjects": subjects
     }
 
@@ -157,38 +289,67 @@ async def update_student_data(roll_no: str, update: StudentUpdate):
     if not data["subjects_data"]:
         raise HTTPException(status_code=404, detail="No subject data uploaded")
     
-    # Normalize roll_no for comparison
-    roll_no_str = str(roll_no).strip()
+    # Canonicalize like the stored roll numbers
+    roll_no_str = canonical_roll(roll_no)
     updated_subjects = []
     
     for subject_update in (update.subjects or []):
         subject_name = subject_update.get('subject_name')
         if subject_name and subject_name in data["subjects_data"]:
             df = data["subjects_data"][subject_name]
-            # Convert roll_no to string for comparison
-            df['roll_no'] = df['roll_no'].astype(str).str.strip()
             idx = df[df['roll_no'] == roll_no_str].index
             
             if not idx.empty:
+                values = {field: subject_update[field] for field in EDITABLE_SUBJECT_FIELDS if field in subject_update}
                 if update.student_name:
-                    df.loc[idx, 'student_name'] = update.student_name
-                df.loc[idx, 'dt_marks'] = subject_update.get('dt_marks', df.loc[idx, 'dt_marks'].values[0])
-                df.loc[idx, 'st_marks'] = subject_update.get('st_marks', df.loc[idx, 'st_marks'].values[0])
-                df.loc[idx, 'at_marks'] = subject_update.get('at_marks', df.loc[idx, 'at_marks'].values[0])
-                df.loc[idx, 'total_marks'] = subject_update.get('total_marks', df.loc[idx, 'total_marks'].values[0])
-                df.loc[idx, 'attendance_conducted'] = subject_update.get('attendance_conducted', df.loc[idx, 'attendance_conducted'].values[0])
-                df.loc[idx, 'attendance_present'] = subject_update.get('attendance_present', df.loc[idx, 'attendance_present'].values[0])
+                    values['student_name'] = update.student_name
+                # Written to a copy while a running generation holds a snapshot of the frame
+                with dataset_lock:
+                    change_log.apply(writable_frame(subject_name), subject_name, roll_no_str, idx, values)
                 updated_subjects.append(subject_name)
     
     return {
         "success": True,
         "message": f"Updated data for {roll_no}",
-        "updated_subjects": updated_subjects
+        "updated_subjects": updated_subjects,
+        "dataset_version": change_log.version
     }
 
 
+@router.get("/student-table")
+async def get_student_table_export(
+    request: Request,
+    shape: Literal["records", "columns"] = "records",
+    format: Literal["json", "csv"] = "json"
+):
+    """Export every student with all subjects side by side ("Subject dt_marks", ...)
+    and their student info, as JSON or as a CSV download"""
+    data = get_uploaded_data()
+    
+    if not data["subjects_data"]:
+        raise HTTPException(status_code=404, detail="No subject data uploaded")
+    
+    if format == "csv":
+        return Response(
+            content=get_student_table().flat().to_csv(index=False),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=student_table.csv", "ETag": change_log.etag}
+        )
+    
+    def build():
+        flat = get_student_table().flat()
+        return {
+            **dataframe_payload(flat, shape),
+            "columns": list(flat.columns),
+            "student_count": len(flat),
+            "dataset_version": change_log.version
+        }
+    
+    return conditional_json(request, change_log.etag, build)
+
+
 @router.get("/backlog")
-async def get_backlog_data():
+async def get_backlog_data(request: Request, shape: Literal["records", "columns"] = "records"):
     """Get all student info/backlog data"""
     data = get_uploaded_data()
     
@@ -196,10 +357,20 @@ async def get_backlog_data():
         raise HTTPException(status_code=404, detail="No student info uploaded")
     
     backlog_df = data["backlog_data"]
+    
+    def build():
+        payload = table_payloads.get((BACKLOG_TABLE, shape), BACKLOG_TABLE, lambda: _backlog_payload(backlog_df, shape))
+        return {**payload, "dataset_version": change_log.version}
+    
+    return conditional_json(request, change_log.etag, build)
+
+
+def _backlog_payload(backlog_df: pd.DataFrame, shape: str) -> Dict[str, Any]:
+    """Build the display payload for the student info table"""
     sem_cols = sorted([col for col in backlog_df.columns if col.startswith('sem')])
     
     return {
-        "records": dataframe_to_dict(backlog_df),
+        **dataframe_payload(backlog_df, shape),
         "columns": list(backlog_df.columns),
         "semester_columns": sem_cols,
         "student_count": len(backlog_df)
@@ -226,33 +397,65 @@ async def update_backlog_data(roll_no: str, update: BacklogUpdate):
     if not roll_col:
         raise HTTPException(status_code=400, detail="No roll_no column in backlog data")
     
-    roll_no_str = str(roll_no).strip()
-    idx = backlog_df[backlog_df[roll_col].astype(str).str.strip() == roll_no_str].index
+    roll_no_str = canonical_roll(roll_no)
+    idx = backlog_df[backlog_df[roll_col] == roll_no_str].index
     
     if idx.empty:
         raise HTTPException(status_code=404, detail=f"Student {roll_no} not found in backlog data")
     
+    values = {}
+    
     # Update student name
     if update.student_name:
         for col in ['student_name', 'student name', 'name']:
             if col in backlog_df.columns:
-                backlog_df.loc[idx, col] = update.student_name
+                values[col] = update.student_name
                 break
     
     # Update father name
     if update.father_name:
         for col in ['father_name', 'father name', 'fathername']:
             if col in backlog_df.columns:
-                backlog_df.loc[idx, col] = update.father_name
+                values[col] = update.father_name
                 break
     
     # Update semester backlogs
     if update.backlogs:
         for sem_col, value in update.backlogs.items():
             if sem_col in backlog_df.columns:
-                backlog_df.loc[idx, sem_col] = value if value else None
+                values[sem_col] = value if value else None
+    
+    # Written to a copy while a running generation holds a snapshot of the frame
+    with dataset_lock:
+        change_log.apply(writable_frame(BACKLOG_TABLE), BACKLOG_TABLE, roll_no_str, idx, values)
+    
+    return {
+        "success": True,
+        "message": f"Updated backlog data for {roll_no}",
+        "dataset_version": change_log.version
+    }
+
+
+@router.get("/changes")
+async def get_changes(since: int = 0):
+    """Get edits recorded after the given dataset version"""
+    return {
+        "dataset_version": change_log.version,
+        "changes": change_log.history(since)
+    }
+
+
+@router.post("/undo")
+async def undo_last_change():
+    """Revert the most recent edit"""
+    with dataset_lock:
+        entry = change_log.undo(writable_frame)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="No changes to undo")
     
     return {
         "success": True,
-        "message": f"Updated backlog data for {roll_no}"
+        "message": f"Reverted change to {entry['roll_no']}",
+        "reverted_version": entry["version"],
+        "dataset_version": change_log.version
     }
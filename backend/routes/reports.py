@@ -2,20 +2,38 @@
 Reports routes for generating and downloading progress reports
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from typing import Callable, Iterator, Literal, Optional, Dict, Any
 from io import BytesIO
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+import asyncio
+import hashlib
+import time
 import zipfile
 import os
 from datetime import datetime
 
-from routes.upload import get_uploaded_data
+from routes.upload import get_uploaded_data, get_change_log, get_student_summary, pinned_snapshot
+from services import ReportConfig, canonical_roll
+from services.change_log import DerivedCache, LRUCache
+from services.memory import REPORTS_HIGH_WATER, evict_oldest
+from services.metrics import REPORT_BYTES, collect_timings, stage, timings_summary
+from services.prefetch import NeighbourPrefetcher, foreground
+from services.html_renderer import render_report_html, wrap_preview_html
+from services.report_layout import build_report_layout
+from services.text_renderer import render_report_text
+from services.renderer_pool import render_report_timed, renderer_pool
+from services.scheduler import SchedulerFull, generation_scheduler
+from services.serialization import dumps
+from services.snapshot import DatasetSnapshot
+from services.validation import student_warnings
 from services.report_generator import (
-    get_student_complete_data,
-    create_comprehensive_student_report,
-    create_consolidated_all_students_report
+    create_consolidated_report_from_layouts,
+    report_filename
 )
 
 router = APIRouter()
@@ -23,129 +41,453 @@ router = APIRouter()
 # Temporary storage for generated reports
 generated_reports: Dict[str, bytes] = {}
 
+# cProfile captures of profiled generations (pstats format), newest last
+generation_profiles: Dict[str, bytes] = {}
+MAX_PROFILES = 5
 
-class ReportConfig(BaseModel):
-    """Configuration for report generation"""
-    students: List[str] = []  # Empty means all students
-    department_name: str = "Computer Science"
-    report_date: str = ""
-    academic_year: str = "2024-2025"
-    semester: str = "B.E- IV Semester"
-    attendance_start: str = ""
-    attendance_end: str = ""
-    template: str = "Detailed"
-    include_backlog: bool = True
-    include_notes: bool = True
+# Roll number -> filename of that student's latest generated report
+report_files: Dict[str, str] = {}
+
+# mammoth conversions of generated reports, keyed by a hash of the DOCX bytes
+converted_previews = LRUCache(maxsize=128, name="converted_previews")
+
+# Rendered per-student reports keyed by (roll_no, config); only students whose
+# data changed since the last generation are rendered again. Only each
+# student's latest settings are kept, so the cache stays one cohort in size.
+rendered_reports = DerivedCache(get_change_log(), name="rendered_reports", one_per_owner=True)
+
+# Report layouts for previews, keyed (and bounded) like rendered_reports
+report_layouts = DerivedCache(get_change_log(), name="report_layouts", one_per_owner=True)
+
+# HTML previews keyed by the (immutable) layout they were rendered from
+preview_html = LRUCache(maxsize=256, name="preview_html")
+
+# Settings of the most recent generation, reused for previews
+report_settings: Dict[str, Any] = {
+    "config": None,
+    "report_date": None
+}
 
 
 @router.post("/generate")
-async def generate_reports(config: ReportConfig):
-    """Generate reports for selected students"""
-    data = get_uploaded_data()
+async def generate_reports(config: ReportConfig, request: Request, profile: bool = False):
+    """Generate reports for selected students.
     
-    if not data["subjects_data"]:
+    With profile=true the run is captured with cProfile; the response then
+    lists the functions with the most self time and the .prof file can be
+    downloaded from /api/reports/profile/{filename}. Profiled runs render
+    every report in the API process, so the renderer pool is bypassed.
+    
+    The run reads a pinned snapshot of the dataset, so edits made meanwhile
+    show up in the next generation rather than in part of this one. Runs go
+    through the generation scheduler: a request identical to one in progress
+    (same dataset version and settings) shares its result, and when every
+    slot and queue place is taken the request gets 429 with Retry-After.
+    Sessions are told apart by the X-Session-Id header (default: client address).
+    """
+    session = _session_id(request)
+    
+    # Pinned at submission, so the job renders the version it was requested for
+    pin = ExitStack()
+    snapshot = pin.enter_context(pinned_snapshot())
+    
+    def run():
+        with pin:
+            return _generate_reports(config, profile, snapshot)
+    
+    try:
+        job, deduplicated = generation_scheduler.submit(
+            (snapshot.version, config.model_dump_json(), profile), session, run
+        )
+    except SchedulerFull as e:
+        pin.close()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if deduplicated:
+        pin.close()
+    
+    response = await asyncio.wrap_future(job.future)
+    return {**response, "job": {"id": job.id, "deduplicated": deduplicated, "wait_ms": job.wait_ms}}
+
+
+@router.get("/generate/stream")
+async def stream_generated_reports(request: Request):
+    """Generate reports, sending each student's result as a Server-Sent Event
+    as soon as their report is stored.
+    
+    Takes the ReportConfig fields as query parameters, with students repeated
+    (?students=1601&students=1602). Events:
+      queued: the run was accepted ({"job"})
+      report: a student's report can be downloaded from download_url;
+              render_ms is the time spent on that student (null if reused)
+              and warnings lists the validation issues in the student's rows
+      failed: a student's report could not be generated
+      done:   the same response POST /generate returns, plus elapsed_ms since
+              the request (queueing included)
+      error:  the run could not start ({"status_code", "detail"})
+    Streamed runs go through the generation scheduler like POST /generate but
+    are never shared with an identical request, since each has its own listener.
+    """
+    config = _query_config(request)
+    requested = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def emit(event: str, data: Dict[str, Any]):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+    
+    pin = ExitStack()
+    snapshot = pin.enter_context(pinned_snapshot())
+    
+    def run():
+        with pin:
+            warnings = student_warnings(
+                snapshot.subjects_data,
+                snapshot.backlog_data,
+                [canonical_roll(roll) for roll in config.students] if config.students else None
+            )
+            
+            def on_report(student_roll, report: Dict[str, Any]):
+                if "error" in report:
+                    emit("failed", {"roll_no": student_roll, **report})
+                else:
+                    emit("report", {"roll_no": student_roll, **report, "warnings": warnings.get(canonical_roll(student_roll), [])})
+            
+            return _generate_reports(config, False, snapshot, on_report)
+    
+    try:
+        # A key of its own, so no other request is handed this run
+        job, _ = generation_scheduler.submit(object(), _session_id(request), run)
+    except SchedulerFull as e:
+        pin.close()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    def finished(future):
+        try:
+            emit("done", {
+                **future.result(),
+                "job": {"id": job.id, "deduplicated": False, "wait_ms": job.wait_ms},
+                "elapsed_ms": round((time.perf_counter() - requested) * 1000, 2)
+            })
+        except HTTPException as e:
+            emit("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            emit("error", {"status_code": 500, "detail": str(e)})
+    
+    emit("queued", {"job": job.id})
+    job.future.add_done_callback(finished)
+    
+    async def event_stream():
+        while True:
+            event, data = await events.get()
+            yield b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+            if event in ("done", "error"):
+                break
+    
+    # The run carries on if the client disconnects; its reports stay downloadable
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # no-transform and X-Accel-Buffering keep proxies from compressing or buffering it
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"}
+    )
+
+
+def _session_id(request: Request) -> str:
+    """Session a generation request is queued under"""
+    return request.headers.get("X-Session-Id") or (request.client.host if request.client else "anonymous")
+
+
+def _query_config(request: Request) -> ReportConfig:
+    """ReportConfig from query parameters (EventSource can only send GET requests)"""
+    params: Dict[str, Any] = dict(request.query_params)
+    params["students"] = request.query_params.getlist("students")
+    try:
+        return ReportConfig(**params)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+@router.get("/jobs")
+async def get_generation_jobs():
+    """Running and queued generations and the scheduler limits"""
+    return generation_scheduler.status()
+
+
+def _generate_reports(config: ReportConfig, profile: bool, snapshot: DatasetSnapshot,
+                      on_report: Optional[Callable[[Any, Dict[str, Any]], None]] = None):
+    """Generate the reports of a snapshot.
+    
+    on_report, if given, is called with each student's roll number as their
+    report is stored ({"filename", "student_name", "download_url", "reused",
+    "render_ms"}) or fails ({"error"}).
+    """
+    if not snapshot.subjects_data:
         raise HTTPException(status_code=400, detail="No subject data uploaded. Please upload subject files first.")
     
     # Determine which students to process
-    students_to_process = config.students if config.students else data["all_students"]
+    students_to_process = config.students if config.students else list(snapshot.all_students)
     
     if not students_to_process:
         raise HTTPException(status_code=400, detail="No students to generate reports for.")
     
-    # Convert DataFrames for report generator
-    import pandas as pd
-    subjects_data = {}
-    for name, df in data["subjects_data"].items():
-        if isinstance(df, pd.DataFrame):
-            subjects_data[name] = df
-        else:
-            subjects_data[name] = pd.DataFrame(df)
-    
-    backlog_data = data.get("backlog_data")
+    # Refuse runs whose reports alone would go past the report high-water mark
+    estimated_bytes = _estimated_report_bytes(len(students_to_process))
+    if REPORTS_HIGH_WATER and estimated_bytes > REPORTS_HIGH_WATER:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Reports for {len(students_to_process)} students would need about "
+                   f"{estimated_bytes / 1048576:.1f} MB, over the {REPORTS_HIGH_WATER / 1048576:.1f} MB "
+                   f"limit (REPORT_MEMORY_LIMIT_MB). Generate fewer students at a time."
+        )
     
     # Set report date if not provided
     report_date = config.report_date or datetime.now().strftime('%d.%m.%Y')
     
-    # Generate individual reports
-    individual_reports = {}
-    for student_roll in students_to_process:
+    report_settings["config"] = config
+    report_settings["report_date"] = report_date
+    
+    # Everything except the student selection affects the rendered document
+    config_key = config.model_dump_json(exclude={"students"}) + report_date
+    
+    profiler = None
+    if profile:
+        # cProfile/pstats are only loaded for profiled requests
+        from services.profiling import profile_bytes, profile_summary, start_profile
         try:
-            student_complete_data = get_student_complete_data(
-                student_roll, 
-                subjects_data, 
-                backlog_data
-            )
-            
-            if not student_complete_data['subjects']:
-                continue
-            
-            doc = create_comprehensive_student_report(
-                student_complete_data,
-                config.department_name,
-                report_date,
-                config.academic_year,
-                config.semester,
-                config.attendance_start,
-                config.attendance_end,
-                config.template,
-                config.include_backlog,
-                config.include_notes,
-                backlog_data
+            profiler = start_profile()
+        except ValueError:
+            raise HTTPException(status_code=409, detail="Another profiled generation is already running")
+    
+    # Generate individual reports
+    try:
+        started = time.perf_counter()
+        report_bytes = 0
+        consolidated_bytes = 0
+        with collect_timings() as timings:
+            # Only students whose data or settings changed since their last report
+            # are rendered; their DOCX rendering is spread over the renderer pool
+            # (reused, report) per student; reports are taken now, so an edit made
+            # during the run can't leave a student with neither a cached nor a new one
+            cached = [
+                rendered_reports.lookup((canonical_roll(student_roll), config_key), student_roll, snapshot.version)
+                for student_roll in students_to_process
+            ]
+            renders = _render_student_reports(
+                [student_roll for student_roll, (reused, _) in zip(students_to_process, cached) if not reused],
+                config, config_key, report_date, snapshot,
+                # Work done in the renderer processes is invisible to cProfile
+                inline=profiler is not None
             )
+        
+            individual_reports = {}
+            rendered_count = 0
+            reused_count = 0
+            for student_roll, (reused, rendered) in zip(students_to_process, cached):
+                # Renders arrive in the order the stale students were submitted
+                outcome, seconds = (None, None) if reused else next(renders)
+                try:
+                    if not reused:
+                        if isinstance(outcome, Exception):
+                            raise outcome
+                        if outcome is not None:
+                            rendered_count += 1
+                        # Kept for later runs unless the student has been edited since the snapshot
+                        rendered = rendered_reports.get(
+                            (canonical_roll(student_roll), config_key),
+                            student_roll,
+                            lambda: outcome,
+                            as_of=snapshot.version
+                        )
+                    if rendered is None:
+                        if on_report is not None:
+                            on_report(student_roll, {"error": f"Student {student_roll} not found in any subject data"})
+                        continue
+                    if reused:
+                        reused_count += 1
             
-            # Save to buffer
-            doc_buffer = BytesIO()
-            doc.save(doc_buffer)
-            doc_buffer.seek(0)
-            
-            student_name = student_complete_data['personal_info']['student_name']
-            filename = f"{student_roll}_{student_name.replace(' ', '_')}_Report.docx"
+                    filename, content, student_name = rendered
             
-            # Store in memory
-            generated_reports[filename] = doc_buffer.getvalue()
+                    # Store in memory (re-inserted so eviction sees it as newest)
+                    generated_reports.pop(filename, None)
+                    generated_reports[filename] = content
+                    report_files[canonical_roll(student_roll)] = filename
             
-            individual_reports[student_roll] = {
-                "filename": filename,
-                "student_name": student_name
-            }
-        except Exception as e:
-            print(f"Error generating report for {student_roll}: {str(e)}")
-            continue
+                    individual_reports[student_roll] = {
+                        "filename": filename,
+                        "student_name": student_name
+                    }
+                    report_bytes += len(content)
+                    if on_report is not None:
+                        on_report(student_roll, {
+                            "filename": filename,
+                            "student_name": student_name,
+                            "download_url": f"/api/reports/download/{filename}",
+                            "reused": reused,
+                            "render_ms": None if reused else round(seconds * 1000, 2)
+                        })
+                except Exception as e:
+                    print(f"Error generating report for {student_roll}: {str(e)}")
+                    if on_report is not None:
+                        on_report(student_roll, {"error": str(e)})
+                    continue
+            # Closes the student_render stage of the (already drained) renders
+            renders.close()
     
-    # Generate consolidated report
-    consolidated_filename = None
-    try:
-        consolidated_doc = create_consolidated_all_students_report(
-            students_to_process,
-            subjects_data,
-            config.department_name,
-            report_date,
-            config.academic_year,
-            config.semester,
-            config.attendance_start,
-            config.attendance_end,
-            config.template,
-            config.include_backlog,
-            config.include_notes,
-            backlog_data
-        )
+            # Generate consolidated report
+            consolidated_filename = None
+            try:
+                # From the layouts the student reports were rendered from (or will
+                # be, for students reused from an earlier run), read off the student table
+                layouts = [
+                    layout for layout in (
+                        _student_layout(student_roll, config, config_key, report_date, snapshot)
+                        for student_roll in students_to_process
+                    )
+                    if layout is not None
+                ]
+                consolidated_doc = create_consolidated_report_from_layouts(layouts)
         
-        consolidated_buffer = BytesIO()
-        consolidated_doc.save(consolidated_buffer)
-        consolidated_buffer.seek(0)
+                consolidated_buffer = BytesIO()
+                with stage("consolidated_save"):
+                    consolidated_doc.save(consolidated_buffer)
+                consolidated_buffer.seek(0)
         
-        consolidated_filename = f"Consolidated_Progress_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        generated_reports[consolidated_filename] = consolidated_buffer.getvalue()
-    except Exception as e:
-        print(f"Error generating consolidated report: {str(e)}")
+                consolidated_filename = f"Consolidated_Progress_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+                generated_reports[consolidated_filename] = consolidated_buffer.getvalue()
+                consolidated_bytes = len(generated_reports[consolidated_filename])
+                REPORT_BYTES.inc(consolidated_bytes, kind="consolidated")
+            except Exception as e:
+                print(f"Error generating consolidated report: {str(e)}")
+    finally:
+        # Also on an error, so the next profiled generation can start
+        if profiler is not None:
+            profiler.disable()
     
-    return {
+    # Keep the stored reports under their high-water mark, oldest first; this
+    # generation's reports stay even if they alone exceed it
+    evicted = evict_oldest(
+        generated_reports,
+        REPORTS_HIGH_WATER,
+        keep=[report["filename"] for report in individual_reports.values()] + [consolidated_filename]
+    )
+    if evicted:
+        evicted_set = set(evicted)
+        for roll, filename in list(report_files.items()):
+            if filename in evicted_set:
+                del report_files[roll]
+                # The cached report holds the same bytes, and its layout goes with it
+                rendered_reports.discard_owner(roll)
+                report_layouts.discard_owner(roll)
+    
+    render_seconds = timings.get("student_render", [0, 0.0])[1]
+    
+    response = {
         "success": True,
         "message": f"Generated reports for {len(individual_reports)} students",
         "reports": individual_reports,
         "consolidated_filename": consolidated_filename,
-        "total_generated": len(individual_reports)
+        "total_generated": len(individual_reports),
+        "evicted_reports": evicted,
+        "timings": {
+            "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            "stages": timings_summary(timings),
+            "students": {
+                "rendered": rendered_count,
+                "reused": reused_count,
+                "mean_render_ms": round(render_seconds / rendered_count * 1000, 2) if rendered_count else 0
+            },
+            "bytes": {
+                "reports": report_bytes,
+                "consolidated": consolidated_bytes
+            }
+        }
     }
+    
+    if profiler is not None:
+        profile_filename = f"Generation_Profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+        generation_profiles[profile_filename] = profile_bytes(profiler)
+        # Keep only the most recent profiles
+        while len(generation_profiles) > MAX_PROFILES:
+            generation_profiles.pop(next(iter(generation_profiles)))
+        response["profile"] = {
+            "filename": profile_filename,
+            "download_url": f"/api/reports/profile/{profile_filename}",
+            "top_functions": profile_summary(profiler)
+        }
+    
+    return response
+
+
+def _estimated_report_bytes(student_count: int) -> int:
+    """Bytes a generation would store, from the size of the student reports already stored"""
+    sizes = [len(generated_reports[f]) for f in report_files.values() if f in generated_reports]
+    if not sizes:
+        return 0
+    # Individual reports plus a consolidated report of about the same total size
+    return int(sum(sizes) / len(sizes) * student_count * 2)
+
+
+def _student_layout(student_roll, config: ReportConfig, config_key: str, report_date: str, snapshot: DatasetSnapshot):
+    """A student's report layout as of the snapshot, or None without subject data.
+    
+    Shared with previews, so a previewed student's layout is reused.
+    """
+    return report_layouts.get(
+        (canonical_roll(student_roll), config_key),
+        student_roll,
+        lambda: _build_student_layout(student_roll, config, report_date, snapshot),
+        as_of=snapshot.version
+    )
+
+
+def _render_student_reports(student_rolls, config: ReportConfig, config_key: str, report_date: str,
+                            snapshot: DatasetSnapshot, inline: bool = False) -> Iterator[Any]:
+    """Render several students' reports on the renderer pool (in this thread with inline=True).
+    
+    The outcomes are yielded in the order of student_rolls, each as soon as it
+    is ready, with the seconds spent on that student (layout and DOCX render):
+    (filename, docx_bytes, student_name), None for a student without subject
+    data, or the exception for a failed render.
+    """
+    with stage("student_render"):
+        layouts = []
+        for student_roll in student_rolls:
+            start = time.perf_counter()
+            try:
+                layout = _student_layout(student_roll, config, config_key, report_date, snapshot)
+            except Exception as e:
+                layout = e
+            layouts.append((student_roll, layout, time.perf_counter() - start))
+        
+        # Worker processes get every layout up front so none sits idle; without
+        # them each report is rendered only when its turn comes, so the first
+        # outcomes don't wait for the whole batch
+        renderable = lambda layout: layout is not None and not isinstance(layout, Exception)
+        futures = {
+            index: renderer_pool.submit(layout, timed=True)
+            for index, (student_roll, layout, _) in enumerate(layouts)
+            if not inline and not renderer_pool.inline and renderable(layout)
+        }
+        
+        for index, (student_roll, layout, layout_seconds) in enumerate(layouts):
+            if not renderable(layout):
+                yield layout, layout_seconds
+                continue
+            try:
+                try:
+                    # Timed in the worker, so time spent queued behind other students doesn't count
+                    future = futures.get(index)
+                    content, render_seconds = future.result() if future is not None else render_report_timed(layout)
+                except BrokenProcessPool:
+                    content, render_seconds = render_report_timed(layout)
+            except Exception as e:
+                yield e, layout_seconds
+                continue
+            REPORT_BYTES.inc(len(content), kind="student")
+            
+            student_name = snapshot.student_data(student_roll)['personal_info']['student_name']
+            filename = report_filename(student_roll, student_name)
+            yield (filename, content, student_name), layout_seconds + render_seconds
 
 
 @router.get("/download/{filename}")
@@ -173,9 +515,11 @@ async def download_all_as_zip():
     
     # Create ZIP in memory
     zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for filename, content in generated_reports.items():
-            zip_file.writestr(filename, content)
+    with stage("zip"):
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for filename, content in generated_reports.items():
+                zip_file.writestr(filename, content)
+    REPORT_BYTES.inc(zip_buffer.tell(), kind="zip")
     
     zip_buffer.seek(0)
     zip_filename = f"All_Reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
@@ -189,6 +533,21 @@ async def download_all_as_zip():
     )
 
 
+@router.get("/profile/{filename}")
+async def download_profile(filename: str):
+    """Download the cProfile capture of a profiled generation"""
+    if filename not in generation_profiles:
+        raise HTTPException(status_code=404, detail="Profile not found. Generate with profile=true first.")
+    
+    return StreamingResponse(
+        BytesIO(generation_profiles[filename]),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        }
+    )
+
+
 @router.get("/list")
 async def list_generated_reports():
     """List all generated reports available for download"""
@@ -200,68 +559,145 @@ async def list_generated_reports():
 
 @router.delete("/clear")
 async def clear_generated_reports():
-    """Clear all generated reports from memory"""
+    """Clear all generated reports from memory, with the caches they were rendered from"""
     generated_reports.clear()
+    report_files.clear()
+    generation_profiles.clear()
+    rendered_reports.clear()
+    report_layouts.clear()
+    preview_html.clear()
+    converted_previews.clear()
     return {"success": True, "message": "All generated reports cleared"}
 
 
 @router.get("/preview-html/{roll_no}")
-async def get_report_preview_html(roll_no: str):
-    """Get HTML preview of a student's report"""
-    import mammoth
+async def get_report_preview_html(roll_no: str, source: Literal["layout", "docx"] = "layout"):
+    """Get HTML preview of a student's report.
     
+    By default the HTML is rendered directly from the student's current data
+    with the settings of the last generation (or the defaults), so it works
+    before any report is generated. source=docx converts the generated DOCX
+    with mammoth instead.
+    """
     data = get_uploaded_data()
     
     if not data["subjects_data"]:
         raise HTTPException(status_code=400, detail="No subject data uploaded")
     
+    if source == "layout":
+        with foreground():
+            html_body = _layout_preview(roll_no)
+        if html_body is None:
+            raise HTTPException(status_code=404, detail=f"Student {roll_no} not found in any subject data")
+        
+        # Warm the previews of the students either side of this one
+        preview_prefetch.schedule(roll_no, data["all_students"])
+        return {
+            "success": True,
+            "html": wrap_preview_html(html_body),
+            "warnings": [],
+            "source": "layout"
+        }
+    
     # Find the report file for this student
-    matching_file = None
-    for filename in generated_reports.keys():
-        if filename.startswith(roll_no):
-            matching_file = filename
-            break
+    matching_file = report_files.get(canonical_roll(roll_no))
     
-    if not matching_file:
+    if not matching_file or matching_file not in generated_reports:
         raise HTTPException(status_code=404, detail=f"No report generated for student {roll_no}")
     
-    # Convert DOCX to HTML
+    # Convert DOCX to HTML (once per distinct document)
+    content = generated_reports[matching_file]
     try:
-        doc_buffer = BytesIO(generated_reports[matching_file])
-        result = mammoth.convert_to_html(doc_buffer)
-        
-        html_content = f"""
-        <style>
-            .report-preview {{
-                font-family: 'Times New Roman', serif;
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .report-preview table {{
-                border-collapse: collapse;
-                width: 100%;
-                margin: 10px 0;
-            }}
-            .report-preview th, .report-preview td {{
-                border: 1px solid #ddd;
-                padding: 8px;
-                text-align: center;
-            }}
-            .report-preview th {{
-                background-color: #f2f2f2;
-                font-weight: bold;
-            }}
-        </style>
-        <div class="report-preview">
-            {result.value}
-        </div>
-        """
-        
-        return {
-            "success": True,
-            "html": html_content,
-            "warnings": [str(m) for m in result.messages] if result.messages else []
-        }
+        html_body, warnings = converted_previews.get(
+            hashlib.sha256(content).hexdigest(),
+            lambda: _convert_docx_to_html(content)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating preview: {str(e)}")
+    
+    return {
+        "success": True,
+        "html": wrap_preview_html(html_body),
+        "warnings": list(warnings),
+        "source": "docx"
+    }
+
+
+def _convert_docx_to_html(content: bytes):
+    """Convert DOCX bytes to HTML with mammoth, returning (html, warnings)"""
+    import mammoth
+    
+    result = mammoth.convert_to_html(BytesIO(content))
+    return result.value, tuple(str(m) for m in result.messages)
+
+
+def _preview_layout(roll_no):
+    """Cached report layout for a student with the current preview settings, or None if not found"""
+    config = report_settings["config"] or ReportConfig()
+    report_date = report_settings["report_date"] or config.report_date or datetime.now().strftime('%d.%m.%Y')
+    config_key = config.model_dump_json(exclude={"students"}) + report_date
+    # Cached under the canonical roll, so built from it too rather than the spelling asked for
+    roll_key = canonical_roll(roll_no)
+    return report_layouts.get(
+        (roll_key, config_key),
+        roll_key,
+        lambda: _build_student_layout(roll_key, config, report_date)
+    )
+
+
+def _layout_preview(roll_no):
+    """Layout-rendered HTML body for a student, or None if not found"""
+    layout = _preview_layout(roll_no)
+    if layout is None:
+        return None
+    # Layouts are immutable and hashable, so an edit that leaves the report
+    # unchanged reuses the HTML already rendered for it
+    return preview_html.get(layout, lambda: render_report_html(layout))
+
+
+# Renders the previews (and student summaries) of neighbouring students ahead of time
+preview_prefetch = NeighbourPrefetcher(_layout_preview)
+
+
+@router.get("/preview-text/{roll_no}", response_class=PlainTextResponse)
+async def get_report_preview_text(roll_no: str):
+    """Get a plain text rendering of a student's report (same settings as the HTML preview)"""
+    data = get_uploaded_data()
+    
+    if not data["subjects_data"]:
+        raise HTTPException(status_code=400, detail="No subject data uploaded")
+    
+    with foreground():
+        layout = _preview_layout(roll_no)
+    if layout is None:
+        raise HTTPException(status_code=404, detail=f"Student {roll_no} not found in any subject data")
+    
+    return PlainTextResponse(render_report_text(layout))
+
+
+def _build_student_layout(student_roll, config: ReportConfig, report_date: str, snapshot: Optional[DatasetSnapshot] = None):
+    """Build one student's report layout from a snapshot (default: the live data), or None
+    if the student has no subject data"""
+    if snapshot is not None:
+        student_complete_data = snapshot.student_data(student_roll)
+        backlog_data = snapshot.backlog_data
+    else:
+        student_complete_data = get_student_summary(student_roll)
+        backlog_data = get_uploaded_data().get("backlog_data")
+    
+    if not student_complete_data['subjects']:
+        return None
+    
+    return build_report_layout(
+        student_complete_data,
+        config.department_name,
+        report_date,
+        config.academic_year,
+        config.semester,
+        config.attendance_start,
+        config.attendance_end,
+        config.template,
+        config.include_backlog,
+        config.include_notes,
+        backlog_data
+    )
@@ -2,14 +2,28 @@
 Upload routes for handling Excel file uploads
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from contextlib import ExitStack, contextmanager
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Literal, Optional, Set
+import os
+import tempfile
+import threading
 import pandas as pd
 
-from services import process_subject_files, process_backlog_file, dataframe_to_dict
+from services import canonical_roll, process_subject_files, process_backlog_file, dataframe_payload
+from services.change_log import BACKLOG_TABLE, ChangeLog, DerivedCache, changed_rolls
+from services.memory import UPLOAD_FILE_LIMIT, UPLOAD_TOTAL_LIMIT, MemoryLimitExceeded, check_dataset_limit
+from services.snapshot import DatasetSnapshot, SnapshotRegistry
+from services.student_table import StudentTable
+from services.validation import validate_dataset
+from services.serialization import FastJSONResponse, conditional_json
 
 router = APIRouter()
 
+# Bytes copied from an upload at a time while spooling it to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # In-memory storage for uploaded data (per-session in production, use Redis/DB)
 uploaded_data = {
     "subjects_data": {},
@@ -17,116 +31,399 @@ uploaded_data = {
     "backlog_data": None
 }
 
+# Edit history and dataset version for uploaded_data
+change_log = ChangeLog()
+
+# Held while uploaded_data is changed and while a snapshot of it is taken, so
+# a snapshot never sees half an upload or edit
+dataset_lock = threading.RLock()
+
+# Dataset versions pinned by running generations; while any is pinned, edits
+# copy the frame they change instead of writing to it
+snapshots = SnapshotRegistry()
+
+# ids of frames copied for an edit since the last snapshot, which no snapshot
+# can be holding and so may be written to directly
+_private_frames: Set[int] = set()
+
+# Roll number -> subjects listing that student, so all_students can be kept
+# up to date when a single subject is replaced
+roll_index: Dict[str, Set[str]] = {}
+
+# One row per student with every subject side by side; only the rows of
+# edited students are rebuilt
+student_table = StudentTable(change_log)
+
+# Per-student data summaries, recomputed only when that student changes
+student_summaries = DerivedCache(change_log, name="student_summaries")
+
 
 @router.post("/subjects")
-async def upload_subject_files(files: List[UploadFile] = File(...)):
+async def upload_subject_files(
+    files: List[UploadFile] = File(...),
+    include_records: bool = False,
+    shape: Literal["records", "columns"] = "records"
+):
     """
     Upload multiple subject Excel files.
     Each file name represents a subject (e.g., Mathematics.xlsx)
+    
+    Returns counts, columns and roll number checks per subject. Records and
+    the student list are only echoed back with include_records=true; use
+    /api/preview/subjects to page through the data instead.
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
     
-    # Read all files into memory
-    file_data = []
     for file in files:
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid file type: {file.filename}. Only Excel files (.xlsx, .xls) are allowed."
-            )
-        content = await file.read()
-        file_data.append((file.filename, content))
+        _check_excel_filename(file.filename)
     
-    # Process the files
-    subjects_data, all_students, error = process_subject_files(file_data)
+    # Spool the files to disk in chunks and parse them from there, so the raw
+    # workbooks are never all held in memory at once
+    with tempfile.TemporaryDirectory(prefix="upload-") as spool_dir:
+        file_data = []
+        spooled = 0
+        for i, file in enumerate(files):
+            path = os.path.join(spool_dir, f"{i}{os.path.splitext(file.filename)[1]}")
+            spooled += await _spool_upload(file, path, spooled)
+            file_data.append((file.filename, path))
+        
+        # Process the files
+        subjects_data, all_students, error = process_subject_files(file_data)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
     
+    # Refuse data that would take the dataset past its memory high-water mark
+    try:
+        check_dataset_limit(subjects_data, uploaded_data["backlog_data"])
+    except MemoryLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
     # Store in memory
-    uploaded_data["subjects_data"] = subjects_data
-    uploaded_data["all_students"] = all_students
-    
-    # Convert DataFrames to serializable format
-    subjects_preview = {}
-    for subject_name, df in subjects_data.items():
-        subjects_preview[subject_name] = {
-            "records": dataframe_to_dict(df),
-            "columns": list(df.columns),
-            "row_count": len(df),
-            "is_lab": bool(df['is_lab'].iloc[0]) if 'is_lab' in df.columns and len(df) > 0 else False
-        }
+    with dataset_lock:
+        uploaded_data["subjects_data"] = subjects_data
+        uploaded_data["all_students"] = all_students
+        roll_index.clear()
+        for subject_name, df in subjects_data.items():
+            for roll_key in _roll_keys(df):
+                roll_index.setdefault(roll_key, set()).add(subject_name)
+        change_log.reset()
     
-    return {
+    # Summarize each subject; records only on request
+    subjects_summary = {
+        subject_name: _subject_summary(df, include_records, shape)
+        for subject_name, df in subjects_data.items()
+    }
+    
+    response = {
         "success": True,
         "message": f"Successfully uploaded {len(files)} subject files",
         "subjects": list(subjects_data.keys()),
         "total_students": len(all_students),
-        "all_students": all_students,
-        "subjects_preview": subjects_preview
+        "dataset_version": change_log.version,
+        "subjects_summary": subjects_summary,
+        "data_validation": validate_dataset(subjects_data, uploaded_data["backlog_data"])
     }
+    if include_records:
+        response["all_students"] = all_students
+    return FastJSONResponse(response)
+
+
+@router.put("/subjects/{subject}")
+async def replace_subject_file(
+    subject: str,
+    file: UploadFile = File(...),
+    include_records: bool = False,
+    shape: Literal["records", "columns"] = "records"
+):
+    """
+    Replace (or add) a single subject from its Excel file.
+    
+    The other subjects, the student info and any edits made to them are kept,
+    and only the reports of students whose rows changed are regenerated.
+    """
+    _check_excel_filename(file.filename)
+    
+    with tempfile.TemporaryDirectory(prefix="upload-") as spool_dir:
+        path = os.path.join(spool_dir, f"subject{os.path.splitext(file.filename)[1]}")
+        await _spool_upload(file, path)
+        parsed, _, error = process_subject_files([(file.filename, path)])
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    df = next(iter(parsed.values()))
+    
+    with dataset_lock:
+        subjects_data = dict(uploaded_data["subjects_data"])
+        old_df = subjects_data.get(subject)
+        subjects_data[subject] = df
+        try:
+            check_dataset_limit(subjects_data, uploaded_data["backlog_data"])
+        except MemoryLimitExceeded as e:
+            raise HTTPException(status_code=413, detail=str(e))
+    
+        # Students whose rows in this subject were added, removed or edited
+        changed = changed_rolls(old_df, df)
+    
+        # Update the roll index and all_students for students entering or leaving the dataset
+        old_keys = set(_roll_keys(old_df)) if old_df is not None else set()
+        new_rolls = dict.fromkeys(_roll_keys(df))
+        removed = set()
+        for roll_key in old_keys - new_rolls.keys():
+            roll_index[roll_key].discard(subject)
+            if not roll_index[roll_key]:
+                del roll_index[roll_key]
+                removed.add(roll_key)
+        added = []
+        for roll_key in new_rolls:
+            if roll_key not in roll_index:
+                added.append(roll_key)
+            roll_index.setdefault(roll_key, set()).add(subject)
+    
+        uploaded_data["subjects_data"] = subjects_data
+        if removed:
+            uploaded_data["all_students"] = [
+                roll for roll in uploaded_data["all_students"] if roll not in removed
+            ]
+        uploaded_data["all_students"] = uploaded_data["all_students"] + added
+        change_log.replace_table(subject, changed)
+    
+    return FastJSONResponse({
+        "success": True,
+        "message": f"{'Replaced' if old_df is not None else 'Added'} subject {subject} ({len(changed)} students changed)",
+        "subject": subject,
+        "replaced": old_df is not None,
+        "changed_students": len(changed),
+        "added_students": len(added),
+        "removed_students": len(removed),
+        "total_students": len(uploaded_data["all_students"]),
+        "dataset_version": change_log.version,
+        "summary": _subject_summary(df, include_records, shape),
+        "data_validation": validate_dataset(subjects_data, uploaded_data["backlog_data"], [subject])
+    })
 
 
 @router.post("/student-info")
-async def upload_student_info(file: UploadFile = File(...)):
+async def upload_student_info(
+    file: UploadFile = File(...),
+    include_records: bool = False,
+    shape: Literal["records", "columns"] = "records"
+):
     """
     Upload student info/backlog Excel file.
     Contains: roll_no, student_name, father_name, sem 1, sem 2, etc.
+    Records are only echoed back with include_records=true.
     """
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(
-            status_code=400, 
-            detail="Invalid file type. Only Excel files (.xlsx, .xls) are allowed."
-        )
+    _check_excel_filename(file.filename)
     
-    content = await file.read()
-    backlog_df, error = process_backlog_file(content)
+    with tempfile.TemporaryDirectory(prefix="upload-") as spool_dir:
+        path = os.path.join(spool_dir, f"student_info{os.path.splitext(file.filename)[1]}")
+        await _spool_upload(file, path)
+        backlog_df, error = process_backlog_file(path)
     
     if error:
         raise HTTPException(status_code=400, detail=error)
     
+    try:
+        check_dataset_limit(uploaded_data["subjects_data"], backlog_df)
+    except MemoryLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
     # Store in memory
-    uploaded_data["backlog_data"] = backlog_df
+    with dataset_lock:
+        uploaded_data["backlog_data"] = backlog_df
+        change_log.reset()
     
     # Get semester columns
     sem_cols = [col for col in backlog_df.columns if col.startswith('sem')]
+    roll_col = next((col for col in ['roll_no', 'roll no', 'rollno'] if col in backlog_df.columns), None)
     
-    return {
+    response = {
         "success": True,
         "message": f"Successfully uploaded student info ({len(backlog_df)} students)",
         "student_count": len(backlog_df),
         "columns": list(backlog_df.columns),
         "semester_columns": sem_cols,
-        "records": dataframe_to_dict(backlog_df)
+        "dataset_version": change_log.version,
+        "validation": _roll_checks(backlog_df[roll_col]) if roll_col else {"roll_column_found": False},
+        # Re-check the subjects: rolls missing from the student info depend on it
+        "data_validation": validate_dataset(uploaded_data["subjects_data"], backlog_df)
     }
+    if include_records:
+        response.update(dataframe_payload(backlog_df, shape))
+    return FastJSONResponse(response)
 
 
 @router.get("/status")
-async def get_upload_status():
+async def get_upload_status(request: Request):
     """Get current upload status"""
     has_subjects = bool(uploaded_data["subjects_data"])
     has_backlog = uploaded_data["backlog_data"] is not None
     
-    return {
+    return conditional_json(request, change_log.etag, lambda: {
         "has_subjects": has_subjects,
         "has_backlog": has_backlog,
         "subjects": list(uploaded_data["subjects_data"].keys()) if has_subjects else [],
         "total_students": len(uploaded_data["all_students"]),
+        "dataset_version": change_log.version,
         "ready_to_generate": has_subjects
-    }
+    })
+
+
+@router.get("/validation")
+async def get_validation_report(request: Request):
+    """Out-of-range marks, attendance over classes conducted, non-numeric cells,
+    duplicate roll numbers and rolls missing from the student info, per subject"""
+    return conditional_json(request, change_log.etag, lambda: validate_dataset(
+        uploaded_data["subjects_data"], uploaded_data["backlog_data"]
+    ))
 
 
 @router.delete("/clear")
 async def clear_uploads():
     """Clear all uploaded data"""
-    uploaded_data["subjects_data"] = {}
-    uploaded_data["all_students"] = []
-    uploaded_data["backlog_data"] = None
+    with dataset_lock:
+        uploaded_data["subjects_data"] = {}
+        uploaded_data["all_students"] = []
+        uploaded_data["backlog_data"] = None
+        roll_index.clear()
+        change_log.reset()
     
     return {"success": True, "message": "All uploads cleared"}
 
 
+def _check_excel_filename(filename: str):
+    if not filename.endswith(('.xlsx', '.xls')):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type: {filename}. Only Excel files (.xlsx, .xls) are allowed."
+        )
+
+
+async def _spool_upload(file: UploadFile, path: str, spooled: int = 0) -> int:
+    """Copy an upload to path in chunks, rejecting it with 413 as soon as it is
+    over UPLOAD_FILE_LIMIT or takes the request past UPLOAD_TOTAL_LIMIT.
+    
+    Args:
+        spooled: Bytes of earlier files in the same request
+    
+    Returns:
+        The size of the upload in bytes
+    """
+    size = 0
+    with open(path, 'wb') as spool:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if UPLOAD_FILE_LIMIT and size > UPLOAD_FILE_LIMIT:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"{file.filename} is larger than the {UPLOAD_FILE_LIMIT / 1048576:g} MB per-file upload limit"
+                )
+            if UPLOAD_TOTAL_LIMIT and spooled + size > UPLOAD_TOTAL_LIMIT:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Upload is larger than the {UPLOAD_TOTAL_LIMIT / 1048576:g} MB per-request limit"
+                )
+            spool.write(chunk)
+    return size
+
+
+def _roll_keys(df: pd.DataFrame) -> List[str]:
+    """Roll numbers of a subject, skipping blanks (canonical since process_subject_files)"""
+    return df['roll_no'].dropna().tolist()
+
+
+def _subject_summary(df: pd.DataFrame, include_records: bool, shape: str) -> dict:
+    """Columns, row count and roll number checks of a subject; records only on request"""
+    summary = {
+        "columns": list(df.columns),
+        "row_count": len(df),
+        "is_lab": bool(df['is_lab'].iloc[0]) if 'is_lab' in df.columns and len(df) > 0 else False,
+        "validation": _roll_checks(df['roll_no'])
+    }
+    if include_records:
+        summary.update(dataframe_payload(df, shape))
+    return summary
+
+
+def _roll_checks(rolls: pd.Series) -> dict:
+    """Count blank and repeated roll numbers in an uploaded sheet (blanks are None after canonicalization)"""
+    return {
+        "roll_column_found": True,
+        "missing_roll_numbers": int(rolls.isna().sum()),
+        "duplicate_roll_numbers": int(rolls.dropna().duplicated().sum())
+    }
+
+
 def get_uploaded_data():
     """Helper to get uploaded data for other routes"""
     return uploaded_data
+
+
+def get_change_log():
+    """Helper to get the change log for other routes"""
+    return change_log
+
+
+def get_student_table() -> StudentTable:
+    """The student table, brought up to date with the current dataset version"""
+    # The frames and the change log version must be read together: an edit
+    # between the two would have its rows stamped current but built from the old frame
+    with dataset_lock:
+        return student_table.sync(uploaded_data["subjects_data"], uploaded_data["backlog_data"])
+
+
+def get_student_summary(roll_no):
+    """A student's data across subjects (as get_student_complete_data) from the student table"""
+    return student_summaries.get(
+        canonical_roll(roll_no),
+        roll_no,
+        lambda: get_student_table().student_data(roll_no)
+    )
+
+
+def current_snapshot() -> DatasetSnapshot:
+    """The dataset as of the current version; pin it with pinned_snapshot to keep it unchanged"""
+    with dataset_lock:
+        _private_frames.clear()
+        return DatasetSnapshot(
+            version=change_log.version,
+            subjects_data=MappingProxyType(dict(uploaded_data["subjects_data"])),
+            backlog_data=uploaded_data["backlog_data"],
+            all_students=tuple(uploaded_data["all_students"]),
+            student_table=get_student_table().frame
+        )
+
+
+@contextmanager
+def pinned_snapshot() -> Iterator[DatasetSnapshot]:
+    """Snapshot the dataset for a job; edits made while the block runs don't reach it"""
+    with ExitStack() as stack:
+        # Pinned before the lock is released, so no edit can write to its frames in between
+        with dataset_lock:
+            snapshot = stack.enter_context(snapshots.pin(current_snapshot()))
+        yield snapshot
+
+
+def writable_frame(table: str) -> Optional[pd.DataFrame]:
+    """The frame of a subject (or the student info table) for an edit to write to.
+    
+    Call with dataset_lock held. While a snapshot is pinned the shared frame is
+    copied and the copy installed in its place; the other frames stay shared.
+    """
+    if table == BACKLOG_TABLE:
+        frame = uploaded_data["backlog_data"]
+    else:
+        frame = uploaded_data["subjects_data"].get(table)
+    if frame is None or not snapshots.copy_on_write or id(frame) in _private_frames:
+        return frame
+    frame = frame.copy()
+    _private_frames.add(id(frame))
+    if table == BACKLOG_TABLE:
+        uploaded_data["backlog_data"] = frame
+    else:
+        uploaded_data["subjects_data"] = {**uploaded_data["subjects_data"], table: frame}
+    return frame
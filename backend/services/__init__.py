@@ -1,19 +1,28 @@
 # Backend services __init__.py
-from .config import COLUMN_MAPPINGS, BACKLOG_COLUMN_MAPPINGS
+from .config import COLUMN_MAPPINGS, BACKLOG_COLUMN_MAPPINGS, ReportConfig
 from .utils import (
     normalize_column_name,
     map_column_name,
+    canonical_roll,
+    canonicalize_rolls,
     process_subject_files,
     process_backlog_file,
-    dataframe_to_dict
+    dataframe_to_dict,
+    dataframe_to_columns,
+    dataframe_payload
 )
 
 __all__ = [
     'COLUMN_MAPPINGS',
     'BACKLOG_COLUMN_MAPPINGS',
+    'ReportConfig',
     'normalize_column_name',
     'map_column_name',
+    'canonical_roll',
+    'canonicalize_rolls',
     'process_subject_files',
     'process_backlog_file',
-    'dataframe_to_dict'
+    'dataframe_to_dict',
+    'dataframe_to_columns',
+    'dataframe_payload'
 ]
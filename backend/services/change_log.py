@@ -0,0 +1,356 @@
+# change_log.py
+# Dataset versioning, edit history and invalidation of derived data
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from .metrics import record_cache_lookup
+from .utils import canonical_roll
+
+# Table name used for the student info/backlog frame in log entries
+BACKLOG_TABLE = "__student_info__"
+
+
+def _same_value(old: Any, new: Any) -> bool:
+    """Compare two cell values, treating NaN/None as equal to each other"""
+    try:
+        if pd.isna(old) and pd.isna(new):
+            return True
+    except (TypeError, ValueError):
+        pass
+    if isinstance(old, str) != isinstance(new, str):
+        return False
+    try:
+        return bool(old == new)
+    except (TypeError, ValueError):
+        return False
+
+
+def _write_cells(frame: pd.DataFrame, index: Any, col: str, value: Any):
+    """Assign value to frame.loc[index, col], widening the column dtype if needed"""
+    try:
+        frame.loc[index, col] = value
+    except (TypeError, ValueError):
+        # e.g. '2' into an int64 semester column
+        frame[col] = frame[col].astype(object)
+        frame.loc[index, col] = value
+
+
+def plain_value(value: Any) -> Any:
+    """Convert numpy/pandas scalars into JSON-friendly Python values"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def changed_rolls(old: Optional[pd.DataFrame], new: Optional[pd.DataFrame], roll_columns: Sequence[str] = ('roll_no',)) -> Set[str]:
+    """Roll numbers whose row was added, removed or edited between two versions of a table.
+
+    Rows are matched on the (canonical) roll number; as in get_student_complete_data
+    only the first row of a repeated roll number counts. Values are compared as
+    text, so a dtype change alone (5 -> 5.0) also counts as an edit.
+    """
+    def keyed_rows(frame: Optional[pd.DataFrame]) -> pd.DataFrame:
+        roll_col = next((col for col in roll_columns if frame is not None and col in frame.columns), None)
+        if roll_col is None:
+            return pd.DataFrame()
+        frame = frame[frame[roll_col].notna()]
+        rows = frame.set_axis(frame[roll_col], axis=0).astype(str)
+        return rows[~rows.index.duplicated()]
+
+    before, after = keyed_rows(old), keyed_rows(new)
+    columns = before.columns.union(after.columns)
+    index = before.index.union(after.index)
+    missing = '\0'  # absent row or column, never a real cell's text
+    before = before.reindex(index=index, columns=columns).fillna(missing)
+    after = after.reindex(index=index, columns=columns).fillna(missing)
+    return set(index[(before != after).any(axis=1)])
+
+
+class ChangeLog:
+    """Append-only log of edits made to the uploaded DataFrames.
+
+    Every edit bumps a monotonically increasing dataset version and stamps the
+    affected student and table with it. Derived data (summaries, reports,
+    preview payloads) is cached against those stamps, so after an edit only
+    the affected students are recomputed. A wholesale replacement (upload or
+    clear) calls reset(), which invalidates everything at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Distinguishes versions across server restarts, which start again at 0
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self.version = 0
+        self.base_version = 0
+        self.entries: List[Dict[str, Any]] = []
+        self._student_versions: Dict[str, int] = {}
+        self._table_versions: Dict[str, int] = {}
+        self._caches: List["DerivedCache"] = []
+
+    def reset(self) -> int:
+        """Start a new dataset generation, dropping history and cached data"""
+        with self._lock:
+            self.version += 1
+            self.base_version = self.version
+            self.entries.clear()
+            self._student_versions.clear()
+            self._table_versions.clear()
+            for cache in self._caches:
+                cache.clear()
+            return self.version
+
+    @property
+    def etag(self) -> str:
+        """Weak HTTP entity tag for the current dataset version"""
+        return f'W/"{self.epoch}-{self.version}"'
+
+    def student_version(self, roll_no: Any) -> int:
+        """Version at which a student's data last changed"""
+        return max(self.base_version, self._student_versions.get(canonical_roll(roll_no), 0))
+
+    def table_version(self, table: str) -> int:
+        """Version at which a subject (or the student info table) last changed"""
+        return max(self.base_version, self._table_versions.get(table, 0))
+
+    def changed_students(self, since_version: int) -> Optional[Set[str]]:
+        """Roll numbers changed after since_version, or None if everything changed"""
+        with self._lock:
+            if since_version < self.base_version:
+                return None
+            return {roll for roll, v in self._student_versions.items() if v > since_version}
+
+    def apply(self, frame: pd.DataFrame, table: str, roll_no: Any, index: pd.Index, values: Dict[str, Any]) -> Optional[int]:
+        """Write values into frame.loc[index] and record the edit.
+
+        Only cells whose value actually changes are written and logged.
+
+        Returns:
+            The new dataset version, or None if nothing changed
+        """
+        roll_key = canonical_roll(roll_no)
+        with self._lock:
+            before, after = {}, {}
+            for col, new_value in values.items():
+                old_value = frame.loc[index, col].values[0] if col in frame.columns else None
+                if col in frame.columns and _same_value(old_value, new_value):
+                    continue
+                before[col] = old_value
+                after[col] = new_value
+                _write_cells(frame, index, col, new_value)
+            if not after:
+                return None
+            self.version += 1
+            self.entries.append({
+                "version": self.version,
+                "table": table,
+                "roll_no": roll_key,
+                "index": list(index),
+                "before": before,
+                "after": after,
+            })
+            self._mark(roll_key, table)
+            return self.version
+
+    def replace_table(self, table: str, rolls: Iterable[str]) -> int:
+        """Record that a whole table was replaced (e.g. one subject re-uploaded).
+
+        Only the given students and the table are marked changed, so cached
+        data of everyone else stays valid. Earlier edits to the table refer to
+        rows of the old frame and are dropped from the history.
+
+        Returns:
+            The new dataset version
+        """
+        with self._lock:
+            self.version += 1
+            self.entries = [entry for entry in self.entries if entry["table"] != table]
+            for roll in rolls:
+                self._student_versions[canonical_roll(roll)] = self.version
+            self._table_versions[table] = self.version
+            return self.version
+
+    def undo(self, resolve_frame: Callable[[str], Optional[pd.DataFrame]]) -> Optional[Dict[str, Any]]:
+        """Revert the most recent edit.
+
+        Args:
+            resolve_frame: Returns the current DataFrame for a table name
+
+        Returns:
+            The reverted log entry, or None if there is nothing to undo
+        """
+        with self._lock:
+            if not self.entries:
+                return None
+            entry = self.entries.pop()
+            frame = resolve_frame(entry["table"])
+            if frame is not None:
+                for col, old_value in entry["before"].items():
+                    _write_cells(frame, entry["index"], col, old_value)
+            self.version += 1
+            self._mark(entry["roll_no"], entry["table"])
+            return entry
+
+    def history(self, since_version: int = 0) -> List[Dict[str, Any]]:
+        """Serializable log entries newer than since_version"""
+        with self._lock:
+            return [
+                {
+                    "version": entry["version"],
+                    "table": entry["table"],
+                    "roll_no": entry["roll_no"],
+                    "before": {k: plain_value(v) for k, v in entry["before"].items()},
+                    "after": {k: plain_value(v) for k, v in entry["after"].items()},
+                }
+                for entry in self.entries
+                if entry["version"] > since_version
+            ]
+
+    def _mark(self, roll_key: str, table: str):
+        self._student_versions[roll_key] = self.version
+        self._table_versions[table] = self.version
+
+    def _register(self, cache: "DerivedCache"):
+        with self._lock:
+            self._caches.append(cache)
+
+
+class DerivedCache:
+    """Cache of values derived from the dataset, validated against a ChangeLog.
+
+    Each entry remembers the version of its owner (a student roll number or a
+    table name) at compute time and is recomputed once that owner changes.
+
+    With one_per_owner, storing a value drops any other key of the same owner
+    (e.g. a student's report under earlier settings), so the cache holds at
+    most one entry per student or table however many settings are used.
+    """
+
+    def __init__(self, change_log: ChangeLog, scope: str = "student", name: Optional[str] = None,
+                 one_per_owner: bool = False):
+        self.name = name
+        self._version_of = change_log.student_version if scope == "student" else change_log.table_version
+        self._owner_id = canonical_roll if scope == "student" else (lambda owner: owner)
+        self._items: Dict[Hashable, Any] = {}
+        # Owner -> its one key, with one_per_owner
+        self._owner_keys: Optional[Dict[Hashable, Hashable]] = {} if one_per_owner else None
+        self._lock = threading.Lock()
+        change_log._register(self)
+
+    def get(self, key: Hashable, owner: Any, compute: Callable[[], Any], as_of: Optional[int] = None) -> Any:
+        """Return the cached value for key, recomputing it if owner has changed.
+
+        as_of is the dataset version compute reads (a snapshot's). If owner has
+        changed since, the value is computed for that version but not cached.
+        """
+        stamp = self._version_of(owner)
+        if as_of is not None and stamp > as_of:
+            record_cache_lookup(self.name, False)
+            return compute()
+        hit = self._items.get(key)
+        if hit is not None and hit[0] == stamp:
+            record_cache_lookup(self.name, True)
+            return hit[1]
+        record_cache_lookup(self.name, False)
+        value = compute()
+        with self._lock:
+            self._items[key] = (stamp, value)
+            if self._owner_keys is not None:
+                previous = self._owner_keys.get(self._owner_id(owner))
+                if previous is not None and previous != key:
+                    self._items.pop(previous, None)
+                self._owner_keys[self._owner_id(owner)] = key
+        return value
+
+    def lookup(self, key: Hashable, owner: Any, as_of: Optional[int] = None) -> Tuple[bool, Any]:
+        """(True, value) if get(key, owner, ..., as_of) would return a cached value, else (False, None).
+
+        The value is read in the same step as its freshness, so an edit made
+        afterwards can't leave the caller with neither. Misses are not counted
+        here; the get() that computes the value counts them.
+        """
+        stamp = self._version_of(owner)
+        hit = self._items.get(key)
+        if hit is None or hit[0] != stamp or (as_of is not None and stamp > as_of):
+            return False, None
+        record_cache_lookup(self.name, True)
+        return True, hit[1]
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def discard_owner(self, owner: Any):
+        """Drop the entry of an owner (one_per_owner caches only)"""
+        if self._owner_keys is None:
+            raise ValueError("discard_owner needs a one_per_owner cache")
+        with self._lock:
+            key = self._owner_keys.pop(self._owner_id(owner), None)
+            if key is not None:
+                self._items.pop(key, None)
+
+    def values(self) -> List[Any]:
+        """The cached values, current or not"""
+        with self._lock:
+            return [value for _, value in self._items.values()]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            if self._owner_keys is not None:
+                self._owner_keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class LRUCache:
+    """Bounded least-recently-used cache for values keyed by content.
+
+    Unlike DerivedCache nothing here goes stale: keys such as a hash of the
+    source bytes change whenever the value would, so old entries simply age out.
+    """
+
+    def __init__(self, maxsize: int = 128, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.name = name
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it on a miss"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                record_cache_lookup(self.name, True)
+                return self._items[key]
+        record_cache_lookup(self.name, False)
+        value = compute()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def values(self) -> List[Any]:
+        with self._lock:
+            return list(self._items.values())
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -1,6 +1,10 @@
 # config.py
 # Configuration and constants for the LORDS Institute Progress Report System
 
+from typing import List
+
+from pydantic import BaseModel
+
 # Column name variations and their standardized names
 COLUMN_MAPPINGS = {
     'roll_no': [
@@ -72,3 +76,17 @@ BACKLOG_COLUMN_MAPPINGS = {
     'sem 7': ['sem 7', 'sem7', 'semester 7', 'semester7', 'vii sem', 'sem-7', '7th sem', 'seventh sem', 's7', 'sem_7'],
     'sem 8': ['sem 8', 'sem8', 'semester 8', 'semester8', 'viii sem', 'sem-8', '8th sem', 'eighth sem', 's8', 'sem_8'],
 }
+
+
+class ReportConfig(BaseModel):
+    """Configuration for report generation"""
+    students: List[str] = []  # Empty means all students
+    department_name: str = "Computer Science"
+    report_date: str = ""
+    academic_year: str = "2024-2025"
+    semester: str = "B.E- IV Semester"
+    attendance_start: str = ""
+    attendance_end: str = ""
+    template: str = "Detailed"
+    include_backlog: bool = True
+    include_notes: bool = True
@@ -0,0 +1,155 @@
+# html_renderer.py
+# HTML rendering of progress reports from the shared report layout
+
+import base64
+import os
+from functools import lru_cache
+from html import escape
+from typing import Any
+
+from .report_layout import (
+    DESCRIPTION_TEXT,
+    GREETING_TEXT,
+    IMPORTANT_NOTE_RUNS,
+    INSTITUTION_ACCREDITATION,
+    INSTITUTION_AFFILIATION,
+    INSTITUTION_NAME,
+    INSTITUTION_STATUS,
+    LEGEND_TEXT,
+    SIGNATURE_TEXT,
+    ReportLayout,
+    Table,
+)
+
+PREVIEW_CSS = """
+<style>
+    .report-preview {
+        font-family: 'Times New Roman', serif;
+        max-width: 800px;
+        margin: 0 auto;
+        padding: 20px;
+    }
+    .report-preview table {
+        border-collapse: collapse;
+        width: 100%;
+        margin: 10px 0;
+    }
+    .report-preview th, .report-preview td {
+        border: 1px solid #ddd;
+        padding: 8px;
+        text-align: center;
+    }
+    .report-preview th {
+        background-color: #f2f2f2;
+        font-weight: bold;
+    }
+    .report-preview table.report-header td { border: none; border-bottom: 1px solid #000; }
+    .report-preview p { margin: 0; }
+    .report-preview .left { text-align: left; }
+    .report-preview .right { text-align: right; }
+    .report-preview .center { text-align: center; }
+    .report-preview .bold { font-weight: bold; }
+    .report-preview .poor { color: #ff0000; }
+</style>
+"""
+
+
+def wrap_preview_html(body: str) -> str:
+    """Wrap report body HTML in the preview container and stylesheet"""
+    return f'{PREVIEW_CSS}<div class="report-preview">{body}</div>'
+
+
+@lru_cache(maxsize=1)
+def _logo_data_uri() -> str:
+    """Institution logo as a data URI (read once per process)"""
+    logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets', 'image.png')
+    if not os.path.exists(logo_path):
+        return ''
+    with open(logo_path, 'rb') as logo_file:
+        return 'data:image/png;base64,' + base64.b64encode(logo_file.read()).decode('ascii')
+
+
+def _text(value: Any) -> str:
+    """Escape text for HTML, keeping line breaks"""
+    return escape(str(value)).replace('\n', '<br>')
+
+
+def _render_table(table: Table) -> str:
+    """Render a layout Table; header rows use <th>, spans become colspan/rowspan"""
+    rows = []
+    for r, row in enumerate(table.rows):
+        tag = 'th' if r < table.header_rows else 'td'
+        cells = []
+        for cell in row:
+            attrs = ''
+            if cell.colspan > 1:
+                attrs += f' colspan="{cell.colspan}"'
+            if cell.rowspan > 1:
+                attrs += f' rowspan="{cell.rowspan}"'
+            classes = [name for name, on in (('left', cell.align == 'left'), ('bold', cell.bold and tag == 'td')) if on]
+            if classes:
+                attrs += f' class="{" ".join(classes)}"'
+            cells.append(f'<{tag}{attrs}>{_text(cell.text)}</{tag}>')
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    return '<table>' + ''.join(rows) + '</table>'
+
+
+def render_report_html(layout: ReportLayout) -> str:
+    """Render a student's report layout (see build_report_layout) as an HTML fragment.
+
+    Mirrors render_report_docx without going through DOCX.
+    """
+    parts = []
+
+    # Header: logo on the left, institution details on the right
+    logo = _logo_data_uri()
+    logo_html = f'<img src="{logo}" alt="Logo" style="width:0.8in">' if logo else ''
+    parts.append(
+        '<table class="report-header"><tr>'
+        f'<td style="width:1in">{logo_html}</td>'
+        '<td class="center">'
+        f'<p class="bold" style="font-size:16pt">{_text(INSTITUTION_NAME)}</p>'
+        f'<p style="font-size:14pt">{_text(INSTITUTION_STATUS)}</p>'
+        f'<p style="font-size:10pt">{_text(INSTITUTION_AFFILIATION)}</p>'
+        f'<p style="font-size:10pt">{_text(INSTITUTION_ACCREDITATION)}</p>'
+        f'<p class="bold" style="font-size:14pt">Department of {_text(layout.department_name)}</p>'
+        '</td></tr></table>'
+    )
+
+    parts.append(f'<p class="right bold">Date: {_text(layout.report_date)}</p>')
+    parts.append('<p class="center bold" style="font-size:16pt"><u>Progress Report</u></p>')
+    parts.append(
+        '<p class="bold" style="display:flex;justify-content:space-between">'
+        f'<span>Academic Year: {_text(layout.academic_year)}</span><span>{_text(layout.semester)}</span></p>'
+    )
+    for label, value in layout.info:
+        parts.append(f'<p class="bold">{_text(label.strip())} : {_text(value)}</p>')
+
+    if layout.detailed:
+        parts.append(f'<p class="bold">{_text(GREETING_TEXT)}</p>')
+        parts.append(f'<p>{_text(DESCRIPTION_TEXT)}</p>')
+
+    if layout.marks_table is None:
+        return ''.join(parts)
+    parts.append(_render_table(layout.marks_table))
+
+    if layout.detailed:
+        parts.append(f'<p>{_text(LEGEND_TEXT)}</p>')
+        note_class = 'poor' if layout.attendance_is_poor else ''
+        parts.append(f'<p class="{note_class}" style="font-size:11pt">{_text(layout.attendance_note)}</p>')
+
+        if layout.notes:
+            parts.append('<p class="bold" style="margin-top:8px">Important Note:</p>')
+            note = ''.join(
+                f'<span class="bold">{_text(text)}</span>' if bold else _text(text)
+                for text, bold in layout.notes
+            )
+            parts.append(f'<p style="font-size:11pt;white-space:pre-wrap">{note}</p>')
+
+        if layout.backlog_table is not None:
+            parts.append('<p class="bold" style="margin-top:12px">Backlog Data:</p>')
+            parts.append(_render_table(layout.backlog_table))
+
+        parts.append(f'<p class="center bold" style="font-size:11pt;margin-top:18px">{_text(SIGNATURE_TEXT)}</p>')
+
+    return ''.join(parts)
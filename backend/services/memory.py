@@ -0,0 +1,177 @@
+# memory.py
+# Byte accounting for the uploaded DataFrames, stored reports and derived caches, with high-water marks
+
+import dataclasses
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from .metrics import Gauge
+
+
+def _limit_from_env(name: str, default_mb: int) -> int:
+    """High-water mark in bytes from an environment variable given in MB (0 disables it)"""
+    return int(float(os.environ.get(name, default_mb)) * 1024 * 1024)
+
+
+# Uploads that would take the in-memory dataset past this are rejected
+DATASET_HIGH_WATER = _limit_from_env("DATASET_MEMORY_LIMIT_MB", 512)
+
+# Older generated reports are evicted once the stored reports exceed this
+REPORTS_HIGH_WATER = _limit_from_env("REPORT_MEMORY_LIMIT_MB", 256)
+
+# Upload size limits, enforced while the upload is streamed to disk
+UPLOAD_FILE_LIMIT = _limit_from_env("UPLOAD_FILE_LIMIT_MB", 25)
+UPLOAD_TOTAL_LIMIT = _limit_from_env("UPLOAD_TOTAL_LIMIT_MB", 200)
+
+MEMORY_BYTES = Gauge('memory_bytes', 'Bytes held in memory by store and item', ['store', 'item'])
+MEMORY_HIGH_WATER = Gauge('memory_high_water_bytes', 'Configured high-water marks (0 means unlimited)', ['store'])
+MEMORY_HIGH_WATER.set(DATASET_HIGH_WATER, store="dataset")
+MEMORY_HIGH_WATER.set(REPORTS_HIGH_WATER, store="reports")
+
+
+class MemoryLimitExceeded(Exception):
+    """Raised when accepting new data would go past a high-water mark"""
+
+
+def dataframe_bytes(df: Optional[pd.DataFrame]) -> int:
+    """Bytes used by a DataFrame, including the Python strings in object columns"""
+    if df is None:
+        return 0
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def object_bytes(value: Any, seen: Set[int]) -> int:
+    """Approximate bytes held by value and everything it references, skipping objects in seen.
+
+    Counted objects are added to seen, so values sharing objects (or sharing
+    them with something counted earlier) are only counted once.
+    """
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return dataframe_bytes(value)
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(object_bytes(k, seen) + object_bytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(object_bytes(item, seen) for item in value)
+    if dataclasses.is_dataclass(value):
+        return size + sum(object_bytes(getattr(value, field.name), seen) for field in dataclasses.fields(value))
+    if hasattr(value, '__dict__'):
+        return size + object_bytes(vars(value), seen)
+    return size
+
+
+def dataset_usage(
+    subjects_data: Dict[str, pd.DataFrame],
+    backlog_data: Optional[pd.DataFrame],
+    student_table: Optional[pd.DataFrame] = None,
+    snapshot_frames: Iterable[pd.DataFrame] = ()
+) -> Dict[str, Any]:
+    """Bytes per subject frame, for the student info frame and the student table
+    built from them, and for frames only pinned snapshots still hold (copies
+    an edit replaced, or an earlier upload)"""
+    subjects = {name: dataframe_bytes(df) for name, df in subjects_data.items()}
+    student_info = dataframe_bytes(backlog_data)
+    table = dataframe_bytes(student_table)
+    live = {id(df) for df in (*subjects_data.values(), backlog_data, student_table) if df is not None}
+    snapshots = sum(object_bytes(df, live) for df in snapshot_frames)
+    return {
+        "subjects": subjects,
+        "student_info": student_info,
+        "student_table": table,
+        "snapshots": snapshots,
+        "total": sum(subjects.values()) + student_info + table + snapshots
+    }
+
+
+def check_dataset_limit(subjects_data: Dict[str, pd.DataFrame], backlog_data: Optional[pd.DataFrame]) -> int:
+    """Bytes the dataset would use; raises MemoryLimitExceeded past DATASET_HIGH_WATER"""
+    total = dataset_usage(subjects_data, backlog_data)["total"]
+    if DATASET_HIGH_WATER and total > DATASET_HIGH_WATER:
+        raise MemoryLimitExceeded(
+            f"Uploaded data needs {total / 1048576:.1f} MB in memory, over the "
+            f"{DATASET_HIGH_WATER / 1048576:.1f} MB limit (DATASET_MEMORY_LIMIT_MB)"
+        )
+    return total
+
+
+def evict_oldest(store: Dict[str, bytes], limit: int, keep: Iterable[str] = ()) -> List[str]:
+    """Drop the oldest entries of an insertion-ordered store until it fits in limit bytes.
+
+    Entries named in keep are never evicted, so the store may stay over the
+    limit when they alone exceed it. Returns the evicted names.
+    """
+    if not limit:
+        return []
+    keep = set(keep)
+    total = sum(len(content) for content in store.values())
+    evicted = []
+    for name in list(store):
+        if total <= limit:
+            break
+        if name in keep:
+            continue
+        total -= len(store.pop(name))
+        evicted.append(name)
+    return evicted
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only), or None"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory_usage(
+    subjects_data: Dict[str, pd.DataFrame],
+    backlog_data: Optional[pd.DataFrame],
+    reports: Dict[str, bytes],
+    caches: Optional[Dict[str, Iterable[Any]]] = None,
+    student_table: Optional[pd.DataFrame] = None,
+    snapshot_frames: Iterable[pd.DataFrame] = ()
+) -> Dict[str, Any]:
+    """Account for the dataset and stored reports, updating the memory gauges.
+
+    caches maps a cache name to its values (rendered reports, layouts,
+    previews); bytes a cache shares with the stored reports count only there.
+    """
+    dataset = dataset_usage(subjects_data, backlog_data, student_table, snapshot_frames)
+    stored = sum(len(content) for content in reports.values())
+    seen = {id(content) for content in reports.values()}
+    cache_bytes = {name: sum(object_bytes(value, seen) for value in values) for name, values in (caches or {}).items()}
+    report_total = stored + sum(cache_bytes.values())
+
+    MEMORY_BYTES.clear()
+    for name, size in dataset["subjects"].items():
+        MEMORY_BYTES.set(size, store="dataset", item=name)
+    for item in ("student_info", "student_table", "snapshots"):
+        MEMORY_BYTES.set(dataset[item], store="dataset", item=item)
+    MEMORY_BYTES.set(stored, store="reports", item="stored")
+    for name, size in cache_bytes.items():
+        MEMORY_BYTES.set(size, store="reports", item=name)
+
+    rss = process_rss_bytes()
+    if rss is not None:
+        MEMORY_BYTES.set(rss, store="process", item="rss")
+
+    return {
+        "dataset": {**dataset, "high_water": DATASET_HIGH_WATER},
+        "reports": {
+            "count": len(reports),
+            "stored": stored,
+            "caches": cache_bytes,
+            "total": report_total,
+            "high_water": REPORTS_HIGH_WATER
+        },
+        "process_rss": rss
+    }
@@ -0,0 +1,176 @@
+# metrics.py
+# In-process metrics in Prometheus text format, plus per-request stage timings
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """A named metric holding one value per label set (Counter, Gauge); Histogram keeps more per set"""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        """One sample line per label set"""
+        return [f'{self.name}{_label_text(self.labelnames, key)} {_number(value)}' for key, value in sorted(self._values.items())]
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}'] + self.samples()
+
+
+class Counter(_Metric):
+    """Monotonic total per label set"""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Current value per label set"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def clear(self):
+        """Drop every label set, e.g. before re-reporting a changing set of items"""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [bucket counts..., +Inf count, sum]
+            state = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, state in sorted(self._values.items()):
+            for i, bound in enumerate(self.buckets):
+                bucket_labels = _label_text(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f'{self.name}_bucket{bucket_labels} {_number(state[i])}')
+            count = state[len(self.buckets)]
+            bucket_labels = _label_text(self.labelnames, key, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{bucket_labels} {_number(count)}')
+            lines.append(f'{self.name}_sum{_label_text(self.labelnames, key)} {_number(state[-1])}')
+            lines.append(f'{self.name}_count{_label_text(self.labelnames, key)} {_number(count)}')
+        return lines
+
+
+class Registry:
+    """All metrics of the process, rendered together for /api/metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram('report_stage_seconds', 'Time spent in each pipeline stage (stages may nest)', ['stage'])
+REPORT_BYTES = Counter('report_bytes_total', 'Bytes of documents produced', ['kind'])
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+
+# Stage timings of the current request, when one is collecting them
+_request_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block (or, as a decorator, a function) as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            entry = timings.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+@contextmanager
+def collect_timings():
+    """Collect the stages timed inside the block; yields {stage: [count, seconds]}"""
+    timings: Dict[str, List[float]] = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def timings_summary(timings: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """Collected timings as {stage: {count, total_ms}}"""
+    return {
+        name: {"count": int(count), "total_ms": round(seconds * 1000, 2)}
+        for name, (count, seconds) in timings.items()
+    }
+
+
+def record_cache_lookup(cache: Optional[str], hit: bool):
+    """Count a hit or miss for a named cache"""
+    if cache:
+        CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
@@ -0,0 +1,101 @@
+# prefetch.py
+# Background warming of per-student data for the students next to the one being viewed
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .utils import canonical_roll
+
+# Students warmed on each side of the one being viewed
+PREFETCH_RADIUS = 2
+
+# Number of real requests currently being served; prefetching waits while > 0
+_foreground = 0
+_idle = threading.Condition()
+
+
+@contextmanager
+def foreground():
+    """Mark a real request in flight so background prefetching yields to it"""
+    global _foreground
+    with _idle:
+        _foreground += 1
+    try:
+        yield
+    finally:
+        with _idle:
+            _foreground -= 1
+            _idle.notify_all()
+
+
+def roll_positions(order: Sequence[Any]) -> Dict[str, int]:
+    """Canonical roll number -> its first position in order"""
+    positions: Dict[str, int] = {}
+    for position, roll in enumerate(order):
+        positions.setdefault(canonical_roll(roll), position)
+    return positions
+
+
+def neighbours(roll_no: Any, order: Sequence[Any], radius: int, positions: Optional[Dict[str, int]] = None) -> List[str]:
+    """Roll numbers around roll_no in order, nearest first (next before previous).
+
+    positions is roll_positions(order), if the caller keeps it between calls.
+    """
+    if positions is None:
+        positions = roll_positions(order)
+    position = positions.get(canonical_roll(roll_no))
+    if position is None:
+        return []
+    result = []
+    for step in range(1, radius + 1):
+        for candidate in (position + step, position - step):
+            if 0 <= candidate < len(order):
+                result.append(canonical_roll(order[candidate]))
+    return result
+
+
+class NeighbourPrefetcher:
+    """Warms cached data for the students adjacent to the one just requested.
+
+    Runs on a single background thread. Scheduling a new student cancels
+    whatever is still pending for the previous one, and each item waits until
+    no foreground request is being served.
+    """
+
+    def __init__(self, warm: Callable[[str], Any], radius: int = PREFETCH_RADIUS):
+        self.warm = warm
+        self.radius = radius
+        self._generation = 0
+        # The last order seen and its roll_positions; the dataset replaces its
+        # student list rather than changing it, so the index is built once per list
+        self._order: Optional[Sequence[Any]] = None
+        self._positions: Dict[str, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+
+    def schedule(self, roll_no: Any, order: Sequence[Any]):
+        """Start warming the neighbours of roll_no, cancelling any earlier run"""
+        if self.radius <= 0:
+            return
+        self._generation += 1
+        if order is not self._order:
+            self._order, self._positions = order, roll_positions(order)
+        targets = neighbours(roll_no, order, self.radius, self._positions)
+        if targets:
+            self._executor.submit(self._run, self._generation, targets)
+
+    def cancel(self):
+        """Drop any pending prefetch work"""
+        self._generation += 1
+
+    def _run(self, generation: int, targets: List[str]):
+        for roll_no in targets:
+            with _idle:
+                _idle.wait_for(lambda: _foreground == 0, timeout=1.0)
+            if generation != self._generation:
+                return
+            try:
+                self.warm(roll_no)
+            except Exception as e:
+                print(f"Error prefetching {roll_no}: {str(e)}")
@@ -0,0 +1,134 @@
+# renderer_pool.py
+# Worker processes that render report layouts to DOCX, started and warmed at startup
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from .report_generator import render_report_bytes
+from .report_layout import ReportLayout
+
+
+def _default_workers() -> int:
+    # Leave a core for the API process itself
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+# Renderer processes (0 renders in the API process)
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", _default_workers()))
+
+
+# Seconds start() waits for every worker to finish warming up
+WARM_UP_TIMEOUT = 60
+
+# Barrier shared by the workers of a starting pool (set in each worker)
+_start_barrier = None
+
+
+def render_report_timed(layout: ReportLayout) -> Tuple[bytes, float]:
+    """render_report_bytes, with the seconds it took where it ran"""
+    start = time.perf_counter()
+    content = render_report_bytes(layout)
+    return content, time.perf_counter() - start
+
+
+def _warm_worker(barrier):
+    """Process initializer: import the renderer and render a dummy report once"""
+    global _start_barrier
+    _start_barrier = barrier
+    from .warmup import render_sample_report
+    render_sample_report()
+
+
+def _check_in() -> int:
+    """Hold this worker until every worker has warmed up, so each takes one check-in"""
+    try:
+        _start_barrier.wait(WARM_UP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+    return os.getpid()
+
+
+class RendererPool:
+    """Renders report layouts to DOCX bytes in worker processes.
+
+    Layouts are immutable and picklable, so only they cross the process
+    boundary: student lookup and layout building stay in the API process where
+    the dataset lives. Until start() has run (or with no workers) reports are
+    rendered in the calling thread.
+    """
+
+    def __init__(self, workers: int = RENDER_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def start(self):
+        """Start the worker processes and wait until they have rendered a dummy report"""
+        with self._lock:
+            if self._executor is not None or self.workers <= 0:
+                self.ready = True
+                return
+            # spawn, not fork: the API process already runs threads (warm-up, prefetch)
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_warm_worker,
+                initargs=(context.Barrier(self.workers),)
+            )
+            executor = self._executor
+        # Each submission starts another worker; a check-in only runs after its
+        # worker's initializer and returns once all workers have checked in
+        pids = {future.result() for future in [executor.submit(_check_in) for _ in range(self.workers)]}
+        self.ready = True
+        print(f"Renderer pool ready: {len(pids)} of {self.workers} workers warm")
+
+    @property
+    def inline(self) -> bool:
+        """Whether submit() renders in the calling thread (no worker processes)"""
+        return self._executor is None
+
+    def submit(self, layout: ReportLayout, timed: bool = False) -> Future:
+        """Render a layout; the future resolves to the DOCX bytes, or with
+        timed=True to (bytes, render seconds)"""
+        render = render_report_timed if timed else render_report_bytes
+        executor = self._executor
+        if executor is not None:
+            try:
+                return executor.submit(render, layout)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                self._restart(executor)
+                if self._executor is not None:
+                    return self._executor.submit(render, layout)
+        future: Future = Future()
+        try:
+            future.set_result(render(layout))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self.ready = False
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.ready = False
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+renderer_pool = RendererPool()
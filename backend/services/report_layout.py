@@ -0,0 +1,332 @@
+# report_layout.py
+# Renderer-independent content of a student's progress report
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .utils import canonical_roll
+
+# Roman numerals used for semester parsing and backlog column headers
+SEMESTER_MAP = {'I': 1, 'II': 2, 'III': 3, 'IV': 4, 'V': 5, 'VI': 6, 'VII': 7, 'VIII': 8}
+ROMAN_NUMERALS = {number: numeral for numeral, number in SEMESTER_MAP.items()}
+SEMESTER_PATTERN = re.compile(r'\b(VIII|VII|VI|V|IV|III|II|I)\b')
+
+MARKS_HEADERS = ['DT\n(20)', 'ST\n(10)', 'AT\n(10)', 'Total\n(40)']
+ATTENDANCE_HEADERS = ['No. of Classes\nConducted', 'No. of Classes\nAttended']
+
+# Marks table column widths in EMU (1/914400 inch), from the reference format.docx:
+# S.No., Course Title, Conducted, Attended, DT, ST, AT, Total
+MARKS_COLUMN_WIDTHS = (447040, 1620520, 1350010, 1259840, 540385, 539750, 540385, 560070)
+# Backlog table remarks column (1.61 in); semester columns size automatically
+REMARKS_COLUMN_WIDTH = 1472184
+
+# Labels of the student info block, padded to line up the colons in the document
+INFO_LABELS = ("Roll No.              ", "Name of the Student ", "Name of the Father   ")
+
+# Fixed report text shared by all renderers
+INSTITUTION_NAME = "LORDS INSTITUTE OF ENGINEERING &TECHNOLOGY"
+INSTITUTION_STATUS = "(Autonomous)"
+INSTITUTION_AFFILIATION = "Approved by AICTE | Affiliated to Osmania University | Estd. 2003."
+INSTITUTION_ACCREDITATION = "Accredited with 'A' grade by NAAC | Accredited by NBA"
+GREETING_TEXT = "Dear Parent/Guardian,"
+DESCRIPTION_TEXT = "The following are the details of the attendance and Continuous Internal Evaluation-1 of your ward. It is furnished for your information."
+LEGEND_TEXT = "*DT – Descriptive Test  ST-Surprise Test  AT- Assignment"
+# (text, bold) runs of the "Important Note" paragraph
+IMPORTANT_NOTE_RUNS = [
+    ("     ➤ As per the ", False),
+    ("Osmania University", True),
+    (" rules, a student must have minimum attendance of 75% in aggregate of all the subjects to be eligible or promoted for the next year. Students having less than 75% attendance in aggregate will not be issued Hall Ticket for the examination, such students will come under Condonation/Detention category.\n", False),
+    ("     ➤ As per State Government rules, the student is not eligible for Scholarship if the attendance is less than 75%.", True),
+]
+SIGNATURE_TEXT = "Sign. of the student: _______________________Sign. of the Parent/Guardian: _________________________"
+
+
+def generate_hod_remark(attendance_percent, cie_percent, backlog_count):
+    """Generate HOD remark based on attendance %, CIE marks %, and backlog count.
+    
+    Rules (checked in order — negative conditions first, then positive):
+      < 75% attendance         → Poor Attendance
+      < 50% CIE                → Academically Weak
+      backlogs >= 5 (only)     → Backlog Concern
+      >= 90% att, >= 85% CIE, 0 backlogs   → Outstanding
+      >= 85% att, >= 75% CIE, <= 2 backlogs → Very Good
+      >= 80% att, >= 70% CIE, <= 2 backlogs → Good Performance
+      >= 75% att, >= 60% CIE, 3-4 backlogs  → Satisfactory
+      >= 75% att, >= 70% CIE, >= 5 backlogs → Needs Improvement
+      else                                   → Satisfactory
+    """
+    # Negative / warning conditions first (override positives)
+    if attendance_percent < 50:
+        return 'Poor Attendance'
+    if cie_percent < 50:
+        return 'Academically Weak'
+    
+    # Positive conditions (most specific first)
+    if attendance_percent >= 90 and cie_percent >= 85 and backlog_count == 0:
+        return 'Outstanding'
+    if attendance_percent >= 85 and cie_percent >= 75 and backlog_count <= 2:
+        return 'Very Good'
+    if attendance_percent >= 80 and cie_percent >= 70 and backlog_count <= 2:
+        return 'Good Performance'
+    if attendance_percent >= 75 and cie_percent >= 60 and 3 <= backlog_count <= 4:
+        return 'Satisfactory'
+    if attendance_percent >= 75 and cie_percent >= 70 and backlog_count >= 5:
+        return 'Needs Improvement'
+    if backlog_count >= 5:
+        return 'Backlog Concern'
+    
+    return 'Satisfactory'
+
+
+def _is_ab(value: Any) -> bool:
+    return isinstance(value, str) and value.strip().lower() == 'ab'
+
+
+def _lab_marks_text(lab_marks: Any) -> str:
+    """Text shown in the merged marks cell of a lab row"""
+    has_lm = (lab_marks != 0) if not isinstance(lab_marks, str) else True
+    if not has_lm:
+        return '-'
+    if str(lab_marks).strip().lower() == 'ab':
+        return 'AB'
+    try:
+        return str(round(float(lab_marks)))
+    except (ValueError, TypeError):
+        return str(lab_marks)
+
+
+def parse_semester_number(semester: str, default: int = 4) -> int:
+    """Parse the semester number from a label such as "B.E- IV Semester" """
+    match = SEMESTER_PATTERN.search(semester or '')
+    if match:
+        return SEMESTER_MAP.get(match.group(1), default)
+    return default
+
+
+def find_student_backlog(student_roll: Any, backlog_data: Optional[pd.DataFrame]) -> Optional[pd.Series]:
+    """Row of the student info frame for a roll number, if present"""
+    if backlog_data is None:
+        return None
+    for col in ['roll_no', 'roll no', 'rollno']:
+        if col in backlog_data.columns:
+            rows = backlog_data[backlog_data[col] == canonical_roll(student_roll)]
+            return None if rows.empty else rows.iloc[0]
+    return None
+
+
+def _semester_value(student_backlog: Optional[pd.Series], sem_num: int) -> Any:
+    if student_backlog is None:
+        return None
+    for col_name in [f'sem {sem_num}', f'sem{sem_num}', f'Sem {sem_num}', f'Sem{sem_num}']:
+        if col_name in student_backlog.index:
+            return student_backlog[col_name]
+    return None
+
+
+@dataclass(frozen=True)
+class Cell:
+    """A table cell; colspan/rowspan > 1 merge it over its neighbours"""
+    text: str
+    colspan: int = 1
+    rowspan: int = 1
+    bold: bool = False
+    align: str = 'center'
+
+
+@dataclass(frozen=True)
+class Table:
+    """Rows of cells plus per-column widths in EMU (None leaves the column to the renderer).
+
+    Like HTML, a row lists only the cells that start in it; positions covered
+    by a rowspan from an earlier row are skipped.
+    """
+    rows: Tuple[Tuple[Cell, ...], ...]
+    widths: Tuple[Optional[int], ...]
+    header_rows: int = 1
+
+    @property
+    def column_count(self) -> int:
+        return len(self.widths)
+
+    def placed(self) -> Iterator[Tuple[int, int, Cell]]:
+        """Yield (row, column, cell) with each cell's grid position resolved"""
+        covered: Set[Tuple[int, int]] = set()
+        for r, row in enumerate(self.rows):
+            c = 0
+            for cell in row:
+                while (r, c) in covered:
+                    c += 1
+                yield r, c, cell
+                for dr in range(cell.rowspan):
+                    for dc in range(cell.colspan):
+                        covered.add((r + dr, c + dc))
+                c += cell.colspan
+
+
+@dataclass(frozen=True)
+class ReportLayout:
+    """Everything a renderer needs to draw one student's progress report.
+
+    Immutable and hashable, so layouts can be cached and compared (or diffed
+    field by field) without going anywhere near python-docx.
+    """
+    department_name: str
+    report_date: str
+    academic_year: str
+    semester: str
+    info: Tuple[Tuple[str, str], ...]
+    detailed: bool
+    marks_table: Optional[Table]  # None when the student has no subject data
+    attendance_percent: float
+    attendance_status: str
+    cie_percent: float
+    notes: Tuple[Tuple[str, bool], ...]  # (text, bold) runs; empty when notes are off
+    backlog_table: Optional[Table]
+    remark: Optional[str]
+
+    @property
+    def attendance_note(self) -> str:
+        return f"Your ward's attendance is {self.attendance_percent:.2f}% which is {self.attendance_status}."
+
+    @property
+    def attendance_is_poor(self) -> bool:
+        return self.attendance_percent < 75
+
+
+def build_report_layout(student_complete_data: Dict[str, Any], department_name: str, report_date: str, academic_year: str, semester: str, attendance_start: str = "", attendance_end: str = "", template: str = "Detailed", include_backlog: bool = True, include_notes: bool = True, backlog_data: Optional[pd.DataFrame] = None) -> ReportLayout:
+    """Compute a student's report independently of any output format.
+
+    Takes the same arguments as create_comprehensive_student_report. The DOCX,
+    HTML and plain text renderers all draw from the result, so marks, totals,
+    percentages and HOD remarks are computed once and always agree.
+    """
+    personal_info = student_complete_data['personal_info']
+    info = tuple(zip(INFO_LABELS, (
+        str(personal_info.get('roll_no', '')),
+        str(personal_info.get('student_name', '')).upper(),
+        str(personal_info.get('father_name', '')).upper(),
+    )))
+    detailed = template == "Detailed"
+
+    period_text = 'Attendance'
+    if attendance_start and attendance_end:
+        period_text += f"\n(From {attendance_start} to {attendance_end})"
+
+    total_attendance_conducted = 0
+    total_attendance_present = 0
+    total_marks_sum = 0
+    total_max_marks = 0
+    num_lab_subjects_with_marks = 0
+    rows: List[Tuple[Cell, ...]] = [
+        (Cell('S. No.', rowspan=2, bold=True), Cell('Course Title', rowspan=2, bold=True),
+         Cell(period_text, colspan=2, bold=True), Cell('CIE-1 Marks', colspan=4, bold=True)),
+        tuple(Cell(header, bold=True) for header in ATTENDANCE_HEADERS + MARKS_HEADERS),
+    ]
+
+    # Sort: theory first (is_lab False/absent), then labs
+    subjects_sorted = sorted(student_complete_data['subjects'], key=lambda s: 1 if s.get('is_lab', False) else 0)
+    for idx, subject in enumerate(subjects_sorted):
+        attendance_conducted = subject['attendance_conducted']
+        attendance_present = subject['attendance_present']
+        total_attendance_conducted += attendance_conducted
+        total_attendance_present += attendance_present
+        if subject.get('is_lab', False):
+            # Labs show one merged marks cell; only labs whose file had a marks
+            # column count towards the percentage
+            lab_marks = subject.get('lab_marks', 0)
+            if subject.get('has_original_lab_marks', False):
+                num_lab_subjects_with_marks += 1
+                lab_marks_str = str(lab_marks).strip() if lab_marks is not None else '0'
+                if lab_marks_str.lower() != 'ab':
+                    try:
+                        total_marks_sum += float(lab_marks)
+                    except (ValueError, TypeError):
+                        pass
+            marks_cells = (Cell(_lab_marks_text(lab_marks), colspan=4),)
+        else:
+            # Theory subject - AB marks show 'AB' and count as 0
+            dt_val, st_val, at_val = subject['dt_marks'], subject['st_marks'], subject['at_marks']
+            dt_is_ab, st_is_ab, at_is_ab = _is_ab(dt_val), _is_ab(st_val), _is_ab(at_val)
+            try:
+                dt_numeric = 0 if dt_is_ab else float(dt_val)
+                st_numeric = 0 if st_is_ab else float(st_val)
+                at_numeric = 0 if at_is_ab else float(at_val)
+            except (ValueError, TypeError):
+                dt_numeric = st_numeric = at_numeric = 0
+            total_marks = dt_numeric + st_numeric + at_numeric
+            total_marks_sum += total_marks
+            total_max_marks += 40
+            marks_cells = (
+                Cell('AB' if dt_is_ab else str(round(dt_numeric))),
+                Cell('AB' if st_is_ab else str(st_numeric)),
+                Cell('AB' if at_is_ab else str(at_numeric)),
+                Cell(str(round(total_marks))),
+            )
+        rows.append((
+            Cell(str(idx + 1)),
+            Cell(str(subject['subject_name']).title(), align='left'),
+            Cell(str(attendance_conducted)),
+            Cell(str(attendance_present)),
+        ) + marks_cells)
+
+    # Add lab subjects with marks to max marks
+    total_max_marks += num_lab_subjects_with_marks * 25
+
+    overall_attendance_percent = (total_attendance_present / total_attendance_conducted * 100) if total_attendance_conducted > 0 else 0
+    cie_percent = (total_marks_sum / total_max_marks * 100) if total_max_marks > 0 else 0
+
+    rows.append((
+        Cell('TOTAL', colspan=2, bold=True),
+        Cell(str(total_attendance_conducted), bold=True),
+        Cell(str(total_attendance_present), bold=True),
+        Cell(str(round(total_marks_sum)) if total_max_marks > 0 else '', colspan=4, bold=True),
+    ))
+    rows.append((
+        Cell('Percentage', colspan=2, bold=True),
+        Cell(f"{overall_attendance_percent:.2f}%", colspan=2, bold=True),
+        Cell(f"{cie_percent:.2f}%" if total_max_marks > 0 else '-', colspan=4, bold=True),
+    ))
+    marks_table = Table(tuple(rows), MARKS_COLUMN_WIDTHS, header_rows=2) if subjects_sorted else None
+
+    backlog_table = None
+    remark = None
+    if include_backlog:
+        # Columns for every previous semester, then the HOD remark
+        num_prev_semesters = max(1, parse_semester_number(semester) - 1)
+        student_backlog = find_student_backlog(personal_info.get('roll_no'), backlog_data)
+        values = []
+        total_backlogs = 0
+        for sem_num in range(1, num_prev_semesters + 1):
+            value = _semester_value(student_backlog, sem_num)
+            has_value = value is not None and pd.notna(value)
+            values.append(str(value) if has_value else '-')
+            if has_value:
+                try:
+                    total_backlogs += int(value)
+                except (ValueError, TypeError):
+                    pass
+        remark = generate_hod_remark(overall_attendance_percent, cie_percent, total_backlogs)
+        headers = [f'{ROMAN_NUMERALS.get(i, str(i))} Sem.' for i in range(1, num_prev_semesters + 1)] + ['Remarks by Head of the Department']
+        backlog_table = Table(
+            (tuple(Cell(h, bold=True) for h in headers), tuple(Cell(v) for v in values + [remark])),
+            (None,) * num_prev_semesters + (REMARKS_COLUMN_WIDTH,)
+        )
+
+    return ReportLayout(
+        department_name=department_name,
+        report_date=report_date,
+        academic_year=academic_year,
+        semester=semester,
+        info=info,
+        detailed=detailed,
+        marks_table=marks_table,
+        attendance_percent=overall_attendance_percent,
+        attendance_status="Poor" if overall_attendance_percent < 75 else "Satisfactory",
+        cie_percent=cie_percent,
+        notes=tuple(IMPORTANT_NOTE_RUNS) if include_notes else (),
+        backlog_table=backlog_table,
+        remark=remark,
+    )
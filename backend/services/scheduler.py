@@ -0,0 +1,157 @@
+# scheduler.py
+# Admission control for generation jobs: a bounded number run, a bounded number wait,
+# sessions take turns and identical requests share one job
+
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from .metrics import Counter, Gauge
+
+# Generations running at once (each already spreads its rendering over the renderer pool)
+GENERATION_CONCURRENCY = int(os.environ.get("GENERATION_CONCURRENCY", 1))
+
+# Generations waiting for a slot; beyond this requests are turned away
+GENERATION_QUEUE_LIMIT = int(os.environ.get("GENERATION_QUEUE_LIMIT", 4))
+
+# Job duration assumed for Retry-After before any job has finished
+DEFAULT_JOB_SECONDS = 10.0
+
+GENERATION_JOBS = Gauge('generation_jobs', 'Generation jobs by state', ['state'])
+GENERATION_REQUESTS = Counter('generation_requests_total', 'Generation requests by outcome', ['outcome'])
+
+
+class SchedulerFull(Exception):
+    """Raised when a job can neither run nor wait; retry_after is in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Too many generations in progress, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """A scheduled call; future resolves to its result"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, key: Hashable, session: str, run: Callable[[], Any]):
+        self.id = next(self._ids)
+        self.key = key
+        self.session = session
+        self.run = run
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+
+    @property
+    def wait_ms(self) -> Optional[float]:
+        """Time spent queued before the job started"""
+        return None if self.started is None else round((self.started - self.submitted) * 1000, 2)
+
+
+class GenerationScheduler:
+    """Runs at most max_running jobs at once in worker threads and queues up to max_queued more.
+
+    Waiting jobs are kept in one queue per session and the sessions take turns,
+    so a coordinator who queues several batches can't hold up everyone else.
+    A job submitted with the key of a queued or running job is not run again:
+    the caller gets the existing job.
+    """
+
+    def __init__(self, max_running: int = GENERATION_CONCURRENCY, max_queued: int = GENERATION_QUEUE_LIMIT):
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self._lock = threading.Lock()
+        self._queues: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._jobs: Dict[Hashable, Job] = {}
+        self._running = 0
+        self._mean_seconds: Optional[float] = None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_running, thread_name_prefix="generation")
+
+    def submit(self, key: Hashable, session: str, run: Callable[[], Any]) -> Tuple[Job, bool]:
+        """Schedule run under key.
+
+        Returns:
+            (job, True) if an identical job was already queued or running, else (job, False)
+
+        Raises:
+            SchedulerFull: every slot is busy and the queue is full
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                GENERATION_REQUESTS.inc(outcome="deduplicated")
+                return job, True
+            if self._running >= self.max_running and self._queued() >= self.max_queued:
+                GENERATION_REQUESTS.inc(outcome="rejected")
+                raise SchedulerFull(self._retry_after())
+            job = Job(key, session, run)
+            self._jobs[key] = job
+            self._queues.setdefault(session, deque()).append(job)
+            GENERATION_REQUESTS.inc(outcome="accepted")
+            self._dispatch()
+            return job, False
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._queued(),
+                "max_running": self.max_running,
+                "max_queued": self.max_queued,
+                "queued_by_session": {session: len(queue) for session, queue in self._queues.items()},
+                "mean_job_seconds": round(self._mean_seconds, 2) if self._mean_seconds is not None else None
+            }
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _retry_after(self) -> int:
+        """Seconds until a queue place is likely to free up"""
+        mean = self._mean_seconds if self._mean_seconds is not None else DEFAULT_JOB_SECONDS
+        return max(1, math.ceil(mean * (self._queued() + 1) / self.max_running))
+
+    def _dispatch(self):
+        """Start queued jobs while slots are free, one session at a time (lock held)"""
+        while self._running < self.max_running and self._queues:
+            session, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            self._running += 1
+            job.started = time.perf_counter()
+            self._executor.submit(self._run, job)
+        self._update_gauges()
+
+    def _run(self, job: Job):
+        try:
+            result, error = job.run(), None
+        except BaseException as e:
+            result, error = None, e
+        seconds = time.perf_counter() - job.started
+        # Retired before the future resolves, so a request arriving once the
+        # result is out starts a new job instead of sharing a finished one
+        with self._lock:
+            self._running -= 1
+            del self._jobs[job.key]
+            # Exponential moving average, so Retry-After follows recent job sizes
+            self._mean_seconds = seconds if self._mean_seconds is None else 0.7 * self._mean_seconds + 0.3 * seconds
+            self._dispatch()
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
+
+    def _update_gauges(self):
+        GENERATION_JOBS.set(self._running, state="running")
+        GENERATION_JOBS.set(self._queued(), state="queued")
+
+
+generation_scheduler = GenerationScheduler()
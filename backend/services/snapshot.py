@@ -0,0 +1,79 @@
+# snapshot.py
+# Immutable views of the uploaded dataset, pinned by generation jobs while they run
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from .student_table import table_student_data
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """The dataset as of one version.
+
+    Nothing reachable from a pinned snapshot is written to: while any snapshot
+    is pinned, an edit copies the one frame it changes and installs the copy
+    (see SnapshotRegistry.copy_on_write), so the other subjects stay shared
+    between versions. A version's frames are freed once the live dataset and
+    every job holding it have moved on.
+    """
+    version: int
+    subjects_data: Mapping[str, pd.DataFrame]
+    backlog_data: Optional[pd.DataFrame]
+    all_students: Tuple[Any, ...]
+    student_table: pd.DataFrame
+
+    def student_data(self, student_roll: Any) -> Dict[str, Any]:
+        """A student's data across subjects, as get_student_complete_data returns it"""
+        return table_student_data(self.student_table, student_roll)
+
+
+class SnapshotRegistry:
+    """Counts the jobs holding each dataset version"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pins: Dict[int, int] = {}
+        # The snapshot first pinned at each version, for memory accounting
+        self._snapshots: Dict[int, DatasetSnapshot] = {}
+
+    @contextmanager
+    def pin(self, snapshot: DatasetSnapshot) -> Iterator[DatasetSnapshot]:
+        """Hold snapshot for the duration of the block"""
+        with self._lock:
+            self._pins[snapshot.version] = self._pins.get(snapshot.version, 0) + 1
+            self._snapshots.setdefault(snapshot.version, snapshot)
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                self._pins[snapshot.version] -= 1
+                if not self._pins[snapshot.version]:
+                    del self._pins[snapshot.version]
+                    del self._snapshots[snapshot.version]
+
+    @property
+    def copy_on_write(self) -> bool:
+        """Whether edits must copy a frame instead of writing to it (a snapshot is pinned)"""
+        return bool(self._pins)
+
+    def pinned(self) -> Dict[int, int]:
+        """Jobs holding each pinned dataset version"""
+        with self._lock:
+            return dict(self._pins)
+
+    def pinned_frames(self) -> List[pd.DataFrame]:
+        """Every frame reachable from a pinned snapshot (shared frames repeat)"""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        frames = []
+        for snapshot in snapshots:
+            frames.extend(snapshot.subjects_data.values())
+            if snapshot.backlog_data is not None:
+                frames.append(snapshot.backlog_data)
+            frames.append(snapshot.student_table)
+        return frames
@@ -0,0 +1,189 @@
+# student_table.py
+# Materialized student x subject table: one row per student, a column group per subject
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .change_log import BACKLOG_TABLE, ChangeLog
+from .metrics import stage
+from .utils import STUDENT_INFO_ROLL_COLUMNS, canonical_roll
+
+# Per-subject fields of a row, with the default get_student_complete_data uses
+# when a subject file lacks the column
+SUBJECT_FIELDS = {
+    'dt_marks': 0,
+    'st_marks': 0,
+    'at_marks': 0,
+    'total_marks': 0,
+    'lab_marks': 0,
+    'attendance_conducted': 0,
+    'attendance_present': 0,
+    'is_lab': False,
+    'has_original_lab_marks': False,
+}
+
+# Column group holding the joined student info fields
+INFO_GROUP = BACKLOG_TABLE
+
+# Student info columns tried in order for the name fields
+NAME_COLUMNS = {
+    'student_name': ['student_name', 'student name', 'name'],
+    'father_name': ['father_name', 'father name', 'fathername'],
+}
+
+
+def _name_field(backlog_df: pd.DataFrame, candidates: List[str]) -> pd.Series:
+    """First non-blank value among the candidate columns, stripped ('' if none)"""
+    result = pd.Series('', index=backlog_df.index, dtype=object)
+    for col in reversed([col for col in candidates if col in backlog_df.columns]):
+        values = backlog_df[col]
+        text = values.astype(str).str.strip()
+        filled = values.notna() & text.ne('')
+        result = result.where(~filled, text)
+    return result
+
+
+def build_student_table(subjects_data: Dict[str, pd.DataFrame], backlog_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Join every subject and the student info on the roll number.
+
+    Columns are (subject, field) pairs plus (INFO_GROUP, column) for the student
+    info; the index is the canonical roll number, in order of first appearance.
+    As in get_student_complete_data only the first row of a repeated roll number
+    counts, and students who appear only in the student info are left out.
+    Values keep their Python types (object columns), so 40 stays 40 rather than
+    becoming 40.0 in rows where another subject is missing.
+    """
+    parts = []
+    for subject_name, df in subjects_data.items():
+        rows = df[df['roll_no'].notna()].drop_duplicates('roll_no')
+        part = pd.DataFrame(
+            {field: rows[field] if field in rows.columns else default for field, default in SUBJECT_FIELDS.items()},
+            index=rows.index
+        ).astype(object)
+        part.index = pd.Index(rows['roll_no'], name='roll_no')
+        part.columns = pd.MultiIndex.from_product([[subject_name], part.columns])
+        parts.append(part)
+    if parts:
+        table = pd.concat(parts, axis=1, sort=False)
+    else:
+        table = pd.DataFrame(index=pd.Index([], name='roll_no'), columns=pd.MultiIndex.from_tuples([], names=[None, None]))
+
+    roll_col = None
+    if backlog_data is not None:
+        roll_col = next((col for col in STUDENT_INFO_ROLL_COLUMNS if col in backlog_data.columns), None)
+    if roll_col is not None:
+        info_rows = backlog_data[backlog_data[roll_col].notna()].drop_duplicates(roll_col)
+        info = info_rows.drop(columns=[roll_col]).astype(object)
+        for field, candidates in NAME_COLUMNS.items():
+            info[field] = _name_field(info_rows, candidates)
+        info.index = pd.Index(info_rows[roll_col], name='roll_no')
+        info = info.reindex(table.index)
+    else:
+        info = pd.DataFrame({field: pd.Series(dtype=object) for field in NAME_COLUMNS}).reindex(table.index)
+    # Students missing from the student info have no name fields
+    for field in NAME_COLUMNS:
+        info[field] = info[field].fillna('')
+    info.columns = pd.MultiIndex.from_product([[INFO_GROUP], info.columns])
+    return pd.concat([table, info], axis=1)
+
+
+class StudentTable:
+    """The student table for the current dataset, kept in step with a ChangeLog.
+
+    The table is built once per upload. After an edit (or a single subject
+    being replaced) only the rows of the students the change log marks as
+    changed are rebuilt; a new or removed subject rebuilds the whole table.
+    Each sync swaps in a new frame, so a caller holding the old one keeps a
+    consistent view.
+    """
+
+    def __init__(self, change_log: ChangeLog):
+        self._change_log = change_log
+        self._lock = threading.Lock()
+        self.frame: pd.DataFrame = build_student_table({})
+        self._subjects: Tuple[str, ...] = ()
+        self._base_version = -1
+        self._version = -1
+
+    def sync(self, subjects_data: Dict[str, pd.DataFrame], backlog_data: Optional[pd.DataFrame]) -> "StudentTable":
+        """Bring the table up to the change log's current version.
+
+        The frames passed in must be the ones that version describes, so
+        callers hold whatever lock their writers take (see get_student_table).
+        """
+        change_log = self._change_log
+        with self._lock:
+            version = change_log.version
+            if version == self._version:
+                return self
+            subjects = tuple(subjects_data)
+            changed = change_log.changed_students(self._version)
+            # Uploads reset the change log; a subject added or dropped changes the columns
+            if changed is None or change_log.base_version != self._base_version or subjects != self._subjects:
+                with stage("student_table_build"):
+                    self.frame = build_student_table(subjects_data, backlog_data)
+            elif changed:
+                with stage("student_table_update"):
+                    self.frame = self._updated(self.frame, changed, subjects_data, backlog_data)
+            self._subjects = subjects
+            self._base_version = change_log.base_version
+            self._version = version
+            return self
+
+    @staticmethod
+    def _updated(frame: pd.DataFrame, rolls: Iterable[str], subjects_data: Dict[str, pd.DataFrame],
+                 backlog_data: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """Copy of frame with the rows of the given students rebuilt from the sources"""
+        rolls = list(rolls)
+        backlog_rows = None
+        if backlog_data is not None:
+            roll_col = next((col for col in STUDENT_INFO_ROLL_COLUMNS if col in backlog_data.columns), None)
+            backlog_rows = backlog_data[backlog_data[roll_col].isin(rolls)] if roll_col else backlog_data
+        rows = build_student_table(
+            {name: df[df['roll_no'].isin(rolls)] for name, df in subjects_data.items()},
+            backlog_rows
+        ).reindex(columns=frame.columns)
+        # Students no longer in any subject drop out; new ones are appended
+        kept = frame.drop(index=[roll for roll in rolls if roll in frame.index and roll not in rows.index])
+        updated = kept.copy()
+        existing = rows.index.intersection(kept.index)
+        updated.loc[existing] = rows.loc[existing]
+        added = rows.index.difference(kept.index, sort=False)
+        if len(added):
+            updated = pd.concat([updated, rows.loc[added]])
+        return updated
+
+    def student_data(self, student_roll: Any) -> Dict[str, Any]:
+        """A student's row in the shape get_student_complete_data returns"""
+        return table_student_data(self.frame, student_roll)
+
+    def flat(self) -> pd.DataFrame:
+        """The table with "subject field" column names and the roll number as a column, for export"""
+        flat = self.frame.copy()
+        flat.columns = [field if group == INFO_GROUP else f"{group} {field}" for group, field in flat.columns]
+        return flat.reset_index()
+
+
+def table_student_data(table: pd.DataFrame, student_roll: Any) -> Dict[str, Any]:
+    """A student's row of a student table in the shape get_student_complete_data returns"""
+    student_complete_data = {'personal_info': {}, 'subjects': []}
+    roll_key = canonical_roll(student_roll)
+    if roll_key not in table.index:
+        return student_complete_data
+    row = dict(zip(table.columns, table.loc[roll_key].tolist()))
+    for subject_name in table.columns.get_level_values(0).unique():
+        # A subject without the student has no is_lab flag in their row
+        if subject_name == INFO_GROUP or pd.isna(row[(subject_name, 'is_lab')]):
+            continue
+        subject_data = {'subject_name': subject_name}
+        subject_data.update((field, row[(subject_name, field)]) for field in SUBJECT_FIELDS)
+        student_complete_data['subjects'].append(subject_data)
+    student_name = row[(INFO_GROUP, 'student_name')]
+    student_complete_data['personal_info'] = {
+        'roll_no': roll_key,
+        'student_name': student_name if student_name else f"Student {student_roll}",
+        'father_name': row[(INFO_GROUP, 'father_name')]
+    }
+    return student_complete_data
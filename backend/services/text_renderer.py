@@ -0,0 +1,118 @@
+# text_renderer.py
+# Plain text rendering of progress reports from the shared report layout
+
+import textwrap
+from typing import Dict, List, Tuple
+
+from .report_layout import (
+    DESCRIPTION_TEXT,
+    GREETING_TEXT,
+    INSTITUTION_ACCREDITATION,
+    INSTITUTION_AFFILIATION,
+    INSTITUTION_NAME,
+    INSTITUTION_STATUS,
+    LEGEND_TEXT,
+    SIGNATURE_TEXT,
+    Cell,
+    ReportLayout,
+    Table,
+)
+
+# Minimum width of the text page in characters
+PAGE_WIDTH = 80
+
+
+def _column_widths(table: Table) -> List[int]:
+    """Character widths per column, widening the last spanned column when a merged cell needs room"""
+    widths = [1] * table.column_count
+    placed = list(table.placed())
+    for _, c, cell in placed:
+        if cell.colspan == 1:
+            widths[c] = max(widths[c], *(len(line) for line in cell.text.split('\n')))
+    for _, c, cell in placed:
+        if cell.colspan > 1:
+            needed = max(len(line) for line in cell.text.split('\n'))
+            available = sum(widths[c:c + cell.colspan]) + 3 * (cell.colspan - 1)
+            if needed > available:
+                widths[c + cell.colspan - 1] += needed - available
+    return widths
+
+
+def render_table_text(table: Table) -> List[str]:
+    """Render a layout Table as bordered text lines; merged cells span their columns"""
+    widths = _column_widths(table)
+    separator = '+' + '+'.join('-' * (w + 2) for w in widths) + '+'
+
+    # Which cell occupies each grid position, and where that cell starts
+    owner: Dict[Tuple[int, int], Tuple[int, int, Cell]] = {}
+    for r, c, cell in table.placed():
+        for dr in range(cell.rowspan):
+            for dc in range(cell.colspan):
+                owner[(r + dr, c + dc)] = (r, c, cell)
+
+    lines = [separator]
+    for r in range(len(table.rows)):
+        segments = []
+        c = 0
+        while c < table.column_count:
+            start_r, start_c, cell = owner.get((r, c), (r, c, Cell('')))
+            span = cell.colspan if start_c == c else 1
+            width = sum(widths[c:c + span]) + 3 * (span - 1)
+            text_lines = cell.text.split('\n') if start_r == r else []
+            segments.append((width, cell.align, text_lines))
+            c += span
+        height = max(1, *(len(text_lines) for _, _, text_lines in segments))
+        for i in range(height):
+            parts = []
+            for width, align, text_lines in segments:
+                text = text_lines[i] if i < len(text_lines) else ''
+                parts.append(text.ljust(width) if align == 'left' else text.center(width))
+            lines.append('| ' + ' | '.join(parts) + ' |')
+        lines.append(separator)
+    return lines
+
+
+def render_report_text(layout: ReportLayout) -> str:
+    """Render a student's report layout (see build_report_layout) as plain text"""
+    table_lines = render_table_text(layout.marks_table) if layout.marks_table is not None else []
+    width = max(PAGE_WIDTH, *(len(line) for line in table_lines)) if table_lines else PAGE_WIDTH
+    lines = [
+        INSTITUTION_NAME.center(width).rstrip(),
+        INSTITUTION_STATUS.center(width).rstrip(),
+        INSTITUTION_AFFILIATION.center(width).rstrip(),
+        INSTITUTION_ACCREDITATION.center(width).rstrip(),
+        f"Department of {layout.department_name}".center(width).rstrip(),
+        '=' * width,
+        f"Date: {layout.report_date}".rjust(width),
+        "PROGRESS REPORT".center(width).rstrip(),
+        '',
+    ]
+    academic = f"Academic Year: {layout.academic_year}"
+    lines.append(academic + layout.semester.rjust(width - len(academic)))
+    lines.extend(f"{label}: {value}" for label, value in layout.info)
+
+    if layout.detailed:
+        lines += ['', GREETING_TEXT]
+        lines += textwrap.wrap(DESCRIPTION_TEXT, width)
+
+    if layout.marks_table is None:
+        return '\n'.join(lines) + '\n'
+    lines.append('')
+    lines.extend(table_lines)
+
+    if layout.detailed:
+        lines.append(LEGEND_TEXT)
+        lines.append(layout.attendance_note)
+
+        if layout.notes:
+            lines += ['', 'Important Note:']
+            note = ''.join(text for text, _ in layout.notes)
+            for paragraph in note.split('\n'):
+                lines += textwrap.wrap(paragraph.strip(), width, initial_indent='  ', subsequent_indent='    ')
+
+        if layout.backlog_table is not None:
+            lines += ['', 'Backlog Data:']
+            lines.extend(render_table_text(layout.backlog_table))
+
+        lines += ['', SIGNATURE_TEXT]
+    return '\n'.join(lines) + '\n'
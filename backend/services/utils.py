@@ -1,11 +1,15 @@
 # utils.py
 # Utility functions for the LORDS Institute Progress Report System
 
+import math
 import re
+import sys
+import numpy as np
 import pandas as pd
 from io import BytesIO
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Union
 from .config import COLUMN_MAPPINGS
+from .metrics import stage
 
 
 def normalize_column_name(col_name: str) -> str:
@@ -25,12 +29,56 @@ def map_column_name(col_name: str) -> str:
     return col_name
 
 
-def process_subject_files(uploaded_files: List[Tuple[str, bytes]]) -> Tuple[Optional[Dict], Optional[List], Optional[str]]:
+# Roll numbers Excel stored as text of a float: "160923730013.0", "1.6092373013E+11"
+_FLOAT_TEXT = re.compile(r'^\d+(\.\d*)?([eE]\+?\d+)?$')
+
+# Columns holding the roll number in the student info frame, in order of preference
+STUDENT_INFO_ROLL_COLUMNS = ['roll_no', 'roll no', 'rollno']
+
+
+def canonical_roll(value: Any) -> Optional[str]:
+    """Canonical form of a roll number: stripped text, with Excel's float artifacts
+    (160923730013.0, 1.6092373013e+11) turned back into the digits. Missing values
+    give None. The result is interned, so equal roll numbers are the same object.
+    """
+    if value is None or value is pd.NA:
+        return None
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if math.isnan(value):
+            return None
+        return sys.intern(str(int(value)) if value.is_integer() else repr(value))
+    text = str(value).strip()
+    if not text or text.lower() == 'nan':
+        return None
+    if _FLOAT_TEXT.match(text) and ('.' in text or 'e' in text.lower()):
+        number = float(text)
+        # Only whole numbers that a float holds exactly; anything else is left as typed
+        if number.is_integer() and number < 2 ** 53:
+            text = str(int(number))
+    return sys.intern(text)
+
+
+def canonicalize_rolls(rolls: pd.Series) -> pd.Series:
+    """canonical_roll over a column, computed once per distinct value"""
+    mapping = {value: canonical_roll(value) for value in rolls.dropna().unique()}
+    return rolls.map(mapping).astype(object)
+
+
+# Workbook contents, or the path of a workbook on disk (read without loading it into memory first)
+ExcelSource = Union[bytes, str]
+
+
+def _excel_input(source: ExcelSource):
+    return BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def process_subject_files(uploaded_files: List[Tuple[str, ExcelSource]]) -> Tuple[Optional[Dict], Optional[List], Optional[str]]:
     """Process multiple Excel files (theory and lab), each representing a subject.
     Labs may contain only attendance columns; theory files include marks.
     
     Args:
-        uploaded_files: List of tuples (filename, file_bytes)
+        uploaded_files: List of tuples (filename, file_bytes or file path)
     
     Returns:
         Tuple of (subjects_data, all_students, error_message)
@@ -42,9 +90,10 @@ def process_subject_files(uploaded_files: List[Tuple[str, bytes]]) -> Tuple[Opti
         # student_name and father_name now come from Student Info file
         minimal_required = ['roll_no', 'attendance_conducted', 'attendance_present']
         
-        for filename, file_bytes in uploaded_files:
+        for filename, source in uploaded_files:
             subject_name = filename.split('.')[0]
-            df = pd.read_excel(BytesIO(file_bytes))
+            with stage("excel_parse"):
+                df = pd.read_excel(_excel_input(source))
             
             column_mapping = {}
             for col in df.columns:
@@ -52,6 +101,8 @@ def process_subject_files(uploaded_files: List[Tuple[str, bytes]]) -> Tuple[Opti
                 if standardized_col in COLUMN_MAPPINGS.keys():
                     column_mapping[col] = standardized_col
             df = df.rename(columns=column_mapping)
+            if 'roll_no' in df.columns:
+                df['roll_no'] = canonicalize_rolls(df['roll_no'])
             
             # Validate minimal columns
             missing_min = [col for col in minimal_required if col not in df.columns]
@@ -82,31 +133,66 @@ def process_subject_files(uploaded_files: List[Tuple[str, bytes]]) -> Tuple[Opti
             
             subjects_data[subject_name] = df
             if 'roll_no' in df.columns:
-                all_students.update(df['roll_no'].tolist())
+                all_students.update(df['roll_no'].dropna().tolist())
                 
         return subjects_data, list(all_students), None
     except Exception as e:
         return None, None, str(e)
 
 
-def process_backlog_file(file_bytes: bytes) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+def process_backlog_file(source: ExcelSource) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
     """Process the student info/backlog Excel file.
     
     Args:
-        file_bytes: Bytes of the Excel file
+        source: Bytes of the Excel file, or its path
     
     Returns:
         Tuple of (backlog_dataframe, error_message)
     """
     try:
-        backlog_df = pd.read_excel(BytesIO(file_bytes))
+        with stage("excel_parse"):
+            backlog_df = pd.read_excel(_excel_input(source))
         # Normalize column names
         backlog_df.columns = [col.lower().strip() for col in backlog_df.columns]
+        roll_col = next((col for col in STUDENT_INFO_ROLL_COLUMNS if col in backlog_df.columns), None)
+        if roll_col is not None:
+            backlog_df[roll_col] = canonicalize_rolls(backlog_df[roll_col])
         return backlog_df, None
     except Exception as e:
         return None, str(e)
 
 
+def dataframe_to_columns(df: pd.DataFrame) -> List[List[Any]]:
+    """Convert a pandas DataFrame to one list of values per column, handling NaN values.
+    
+    Missing values become '' like dataframe_to_dict, but only the affected
+    cells are touched instead of copying the whole frame with fillna.
+    """
+    column_values = []
+    for _, series in df.items():
+        values = series.tolist()
+        missing = series.isna().to_numpy()
+        if missing.any():
+            for i in missing.nonzero()[0]:
+                values[i] = ''
+        column_values.append(values)
+    return column_values
+
+
 def dataframe_to_dict(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """Convert a pandas DataFrame to a list of dictionaries, handling NaN values."""
-    return df.fillna('').to_dict(orient='records')
+    columns = list(df.columns)
+    if not columns:
+        return [{} for _ in range(len(df))]
+    return [dict(zip(columns, row)) for row in zip(*dataframe_to_columns(df))]
+
+
+def dataframe_payload(df: pd.DataFrame, shape: str = "records") -> Dict[str, Any]:
+    """Serialize table rows in the requested shape.
+    
+    'records' gives a list of row dicts; 'columns' gives one value array per
+    column (aligned with the column list), which is much smaller on the wire.
+    """
+    if shape == "columns":
+        return {"column_values": dataframe_to_columns(df)}
+    return {"records": dataframe_to_dict(df)}
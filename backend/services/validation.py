@@ -0,0 +1,149 @@
+# validation.py
+# Checks uploaded subject frames for out-of-range, inconsistent and unmatched values
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+import pandas as pd
+
+from .change_log import plain_value
+from .metrics import stage
+from .utils import STUDENT_INFO_ROLL_COLUMNS
+
+# Highest mark each component can take
+MARK_LIMITS = {'dt_marks': 20, 'st_marks': 10, 'at_marks': 10, 'lab_marks': 25}
+
+ATTENDANCE_COLUMNS = ['attendance_conducted', 'attendance_present']
+
+# Example rows listed per check; the count always covers every row
+MAX_EXAMPLES = 20
+
+def student_info_rolls(backlog_df: Optional[pd.DataFrame]) -> Optional[Set[str]]:
+    """Roll numbers of the student info frame, or None without one"""
+    if backlog_df is None:
+        return None
+    roll_col = next((col for col in STUDENT_INFO_ROLL_COLUMNS if col in backlog_df.columns), None)
+    if roll_col is None:
+        return None
+    return set(backlog_df[roll_col].dropna().unique())
+
+
+def _check(df: pd.DataFrame, mask: pd.Series, columns: Iterable[str]) -> Dict[str, Any]:
+    """Count of the rows in mask and the first few of them, with the offending values"""
+    hits = df.loc[mask, ['roll_no'] + [col for col in columns if col != 'roll_no']].head(MAX_EXAMPLES)
+    return {
+        "count": int(mask.sum()),
+        "rows": [
+            {col: plain_value(value) for col, value in zip(hits.columns, row)}
+            for row in hits.itertuples(index=False)
+        ]
+    }
+
+
+def _subject_checks(df: pd.DataFrame, known_rolls: Optional[Set[str]] = None) -> Dict[str, Tuple[pd.Series, List[str]]]:
+    """Every check over one subject frame as whole-column operations.
+
+    Returns:
+        {check: (row mask, columns showing the offending values)} for each check that found something
+    """
+    checks: Dict[str, Tuple[pd.Series, List[str]]] = {}
+    is_lab = bool(df['is_lab'].iloc[0]) if 'is_lab' in df.columns and len(df) > 0 else False
+    has_lab_marks = is_lab and bool(df['has_original_lab_marks'].iloc[0])
+
+    # Labs only have a lab mark (if any); theory files get a filler lab_marks column
+    mark_columns = ['lab_marks'] if has_lab_marks else [] if is_lab else ['dt_marks', 'st_marks', 'at_marks']
+    for col in mark_columns + ATTENDANCE_COLUMNS:
+        values = df[col]
+        numeric = pd.to_numeric(values, errors='coerce')
+        non_numeric = values.notna() & numeric.isna()
+        if col in MARK_LIMITS and non_numeric.any():
+            # Absences are only recorded for marks; only the few text cells are inspected
+            text = values[non_numeric].astype(str).str.strip().str.lower()
+            non_numeric[text.index[text == 'ab']] = False
+        if non_numeric.any():
+            checks[f"non_numeric_{col}"] = (non_numeric, [col])
+        limit = MARK_LIMITS.get(col)
+        out_of_range = (numeric < 0) | (numeric > limit) if limit is not None else numeric < 0
+        if out_of_range.any():
+            checks[f"out_of_range_{col}"] = (out_of_range, [col])
+
+    conducted = pd.to_numeric(df['attendance_conducted'], errors='coerce')
+    present = pd.to_numeric(df['attendance_present'], errors='coerce')
+    over_attended = present > conducted
+    if over_attended.any():
+        checks["present_over_conducted"] = (over_attended, ATTENDANCE_COLUMNS)
+
+    # Roll numbers are canonical strings (None when blank) since upload
+    roll_keys = df['roll_no']
+    has_roll = roll_keys.notna()
+    duplicated = has_roll & roll_keys.duplicated()
+    if duplicated.any():
+        checks["duplicate_roll_no"] = (duplicated, [])
+
+    if known_rolls is not None:
+        unmatched = has_roll & ~roll_keys.isin(known_rolls)
+        if unmatched.any():
+            checks["missing_from_student_info"] = (unmatched, [])
+    return checks
+
+
+def validate_subject(df: pd.DataFrame, known_rolls: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """Run every check over one subject frame.
+
+    Args:
+        df: Subject frame as returned by process_subject_files
+        known_rolls: Roll numbers of the student info, if uploaded
+
+    Returns:
+        {check: {"count", "rows"}} for each check that found something
+    """
+    return {name: _check(df, mask, columns) for name, (mask, columns) in _subject_checks(df, known_rolls).items()}
+
+
+def student_warnings(subjects_data: Mapping[str, pd.DataFrame], backlog_df: Optional[pd.DataFrame] = None,
+                     rolls: Optional[Iterable[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """The same checks as validate_dataset, grouped by student.
+
+    Args:
+        rolls: Canonical roll numbers to report on (default: every student with a warning)
+
+    Returns:
+        {roll: [{"subject", "check", "values"}]} for each student with a warning
+    """
+    with stage("validation"):
+        known_rolls = student_info_rolls(backlog_df)
+        wanted = set(rolls) if rolls is not None else None
+        warnings: Dict[str, List[Dict[str, Any]]] = {}
+        for name, df in subjects_data.items():
+            for check, (mask, columns) in _subject_checks(df, known_rolls).items():
+                hits = df.loc[mask, ['roll_no'] + columns]
+                if wanted is not None:
+                    hits = hits[hits['roll_no'].isin(wanted)]
+                for row in hits.itertuples(index=False):
+                    warnings.setdefault(row[0], []).append({
+                        "subject": name,
+                        "check": check,
+                        "values": {col: plain_value(value) for col, value in zip(columns, row[1:])}
+                    })
+    return warnings
+
+
+def validate_dataset(subjects_data: Dict[str, pd.DataFrame], backlog_df: Optional[pd.DataFrame] = None,
+                     subjects: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Validate the given subjects (default: all) against the student info.
+
+    Nothing is rejected: the report lists what would otherwise only show up
+    as a 0 or '-' in a rendered report.
+    """
+    with stage("validation"):
+        known_rolls = student_info_rolls(backlog_df)
+        reports = {}
+        for name in (subjects if subjects is not None else subjects_data):
+            issues = validate_subject(subjects_data[name], known_rolls)
+            if issues:
+                reports[name] = issues
+    return {
+        "valid": not reports,
+        "issue_count": sum(check["count"] for issues in reports.values() for check in issues.values()),
+        "student_info_checked": known_rolls is not None,
+        "subjects": reports
+    }
@@ -0,0 +1,94 @@
+# warmup.py
+# Loads the dependencies the first upload, generation and preview would otherwise pay for,
+# renders a dummy report and starts the renderer pool
+
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+
+def _import_excel_reader():
+    # pandas imports openpyxl on the first read_excel call
+    import openpyxl  # noqa: F401
+
+
+def _import_mammoth():
+    # Used by /preview-html?source=docx
+    import mammoth  # noqa: F401
+
+
+def _load_logo():
+    from .html_renderer import _logo_data_uri
+    _logo_data_uri()
+
+
+def _load_docx_template():
+    # The first Document() parses python-docx's default template
+    from .report_generator import new_report_document
+    new_report_document()
+
+
+# A made-up student with a theory subject, a lab and an absence, so a dummy
+# report goes through every rendering path
+SAMPLE_STUDENT = {
+    'personal_info': {'roll_no': '0000', 'student_name': 'Sample Student', 'father_name': 'Sample Parent'},
+    'subjects': [
+        {'subject_name': 'Theory', 'dt_marks': 15, 'st_marks': 'AB', 'at_marks': 8, 'total_marks': 23,
+         'lab_marks': 0, 'attendance_conducted': 40, 'attendance_present': 30, 'is_lab': False,
+         'has_original_lab_marks': False},
+        {'subject_name': 'Lab', 'dt_marks': 0, 'st_marks': 0, 'at_marks': 0, 'total_marks': 0,
+         'lab_marks': 18, 'attendance_conducted': 12, 'attendance_present': 12, 'is_lab': True,
+         'has_original_lab_marks': True},
+    ]
+}
+
+
+def render_sample_report() -> bytes:
+    """Render SAMPLE_STUDENT's report to DOCX, loading everything a real render uses"""
+    from .report_generator import render_report_bytes
+    from .report_layout import build_report_layout
+    layout = build_report_layout(SAMPLE_STUDENT, "Warm-up", "01.01.2025", "2024-2025", "B.E- IV Semester")
+    return render_report_bytes(layout)
+
+
+def _start_renderer_pool():
+    from .renderer_pool import renderer_pool
+    renderer_pool.start()
+
+
+WARM_UP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("excel_reader", _import_excel_reader),
+    ("mammoth", _import_mammoth),
+    ("logo", _load_logo),
+    ("docx_template", _load_docx_template),
+    ("dummy_report", render_sample_report),
+    ("renderer_pool", _start_renderer_pool),
+]
+
+# Milliseconds per completed step (None for a step that failed)
+warm_up_timings: Dict[str, float] = {}
+
+# Set once every warm-up step has run; /api/ready reports ready only after this
+warmed_up = threading.Event()
+
+
+def warm_up() -> Dict[str, float]:
+    """Run every warm-up step, recording how long each took"""
+    for name, step in WARM_UP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {str(e)}")
+            warm_up_timings[name] = None
+            continue
+        warm_up_timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    warmed_up.set()
+    return warm_up_timings
+
+
+def start_warm_up() -> threading.Thread:
+    """Warm up in a background thread so the server starts accepting requests immediately"""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,65 @@
+from services.change_log import ChangeLog, DerivedCache
+
+
+def _cache():
+    change_log = ChangeLog()
+    change_log.reset()
+    return change_log, DerivedCache(change_log)
+
+
+def test_lookup_returns_cached_value():
+    change_log, cache = _cache()
+    assert cache.lookup("key", "1601") == (False, None)
+    cache.get("key", "1601", lambda: "report")
+    assert cache.lookup("key", "1601", as_of=change_log.version) == (True, "report")
+
+
+def test_lookup_keeps_value_taken_before_an_edit():
+    change_log, cache = _cache()
+    cache.get("key", "1601", lambda: "report")
+    snapshot_version = change_log.version
+    reused, value = cache.lookup("key", "1601", as_of=snapshot_version)
+
+    change_log.replace_table("Mathematics", ["1601"])
+
+    # The value taken at lookup stands; later lookups see the edit
+    assert (reused, value) == (True, "report")
+    assert cache.lookup("key", "1601", as_of=snapshot_version) == (False, None)
+    assert cache.lookup("key", "1601") == (False, None)
+
+
+def test_get_after_edit_does_not_cache_the_snapshot_value():
+    change_log, cache = _cache()
+    snapshot_version = change_log.version
+    change_log.replace_table("Mathematics", ["1601"])
+
+    assert cache.get("key", "1601", lambda: "old", as_of=snapshot_version) == "old"
+    assert cache.lookup("key", "1601") == (False, None)
+    assert cache.get("key", "1601", lambda: "new") == "new"
+    assert cache.lookup("key", "1601") == (True, "new")
+
+
+def test_one_per_owner_keeps_only_the_latest_key():
+    change_log = ChangeLog()
+    change_log.reset()
+    cache = DerivedCache(change_log, one_per_owner=True)
+    cache.get(("1601", "a"), "1601", lambda: "report a")
+    cache.get(("1602", "a"), "1602", lambda: "other student")
+    cache.get(("1601", "b"), " 1601 ", lambda: "report b")
+
+    assert len(cache) == 2
+    assert cache.lookup(("1601", "a"), "1601") == (False, None)
+    assert cache.lookup(("1601", "b"), "1601") == (True, "report b")
+    assert cache.lookup(("1602", "a"), "1602") == (True, "other student")
+
+
+def test_discard_owner_drops_the_owners_entry():
+    change_log = ChangeLog()
+    change_log.reset()
+    cache = DerivedCache(change_log, one_per_owner=True)
+    cache.get(("1601", "a"), "1601", lambda: "report a")
+    cache.get(("1602", "a"), "1602", lambda: "other student")
+    cache.discard_owner(" 1601 ")
+
+    assert cache.values() == ["other student"]
+    assert cache.lookup(("1601", "a"), "1601") == (False, None)
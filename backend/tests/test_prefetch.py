@@ -0,0 +1,20 @@
+from services.prefetch import NeighbourPrefetcher, neighbours, roll_positions
+
+
+def test_neighbours_nearest_first():
+    order = ["1601", "1602", "1603", "1604", "1605"]
+    assert neighbours("1603", order, 2) == ["1604", "1602", "1605", "1601"]
+    assert neighbours(" 1601 ", order, 2, roll_positions(order)) == ["1602", "1603"]
+    assert neighbours("9999", order, 2) == []
+
+
+def test_positions_are_rebuilt_only_for_a_new_student_list():
+    prefetcher = NeighbourPrefetcher(lambda roll: None, radius=1)
+    order = ["1601", "1602"]
+    prefetcher.schedule("1601", order)
+    positions = prefetcher._positions
+    prefetcher.schedule("1602", order)
+    assert prefetcher._positions is positions
+
+    prefetcher.schedule("1601", order + ["1603"])
+    assert prefetcher._positions is not positions
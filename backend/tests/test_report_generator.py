@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.cohort import make_cohort
+from services import process_backlog_file, process_subject_files
+from services.report_generator import (
+    create_consolidated_all_students_report,
+    create_consolidated_report_from_files,
+    create_consolidated_report_from_layouts,
+    get_student_complete_data,
+    render_report_bytes
+)
+from services.report_layout import build_report_layout
+
+# Paragraph text and alignment of the consolidated report for the cohort below,
+# as rendered before reports were described by a ReportLayout
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "consolidated_paragraphs.json")
+
+REPORT_ARGS = ("Computer Science", "01.07.2025", "2024-2025", "B.E- IV Semester", "01.01.2025", "30.06.2025",
+               "Detailed", True, True)
+
+
+@pytest.fixture(scope="module")
+def cohort():
+    subject_files, info = make_cohort(3, theory_subjects=2, lab_subjects=1, seed=0)
+    subjects_data, students, _ = process_subject_files(subject_files)
+    backlog_data, _ = process_backlog_file(info)
+    return subjects_data, sorted(students), backlog_data
+
+
+def _paragraphs(doc):
+    return [[p.text, None if p.alignment is None else int(p.alignment)] for p in doc.paragraphs]
+
+
+def _layouts(cohort):
+    subjects_data, students, backlog_data = cohort
+    return [
+        build_report_layout(get_student_complete_data(roll, subjects_data, backlog_data), *REPORT_ARGS, backlog_data)
+        for roll in students
+    ]
+
+
+@pytest.fixture(scope="module")
+def expected():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_consolidated_report_keeps_its_page_layout(cohort, expected):
+    subjects_data, students, backlog_data = cohort
+    doc = create_consolidated_all_students_report(students, subjects_data, *REPORT_ARGS, backlog_data)
+    assert _paragraphs(doc) == expected
+
+
+def test_consolidated_report_from_layouts_matches(cohort, expected):
+    assert _paragraphs(create_consolidated_report_from_layouts(_layouts(cohort))) == expected
+
+
+def test_consolidated_report_from_files_matches(cohort, expected):
+    reports = [render_report_bytes(layout) for layout in _layouts(cohort)]
+    assert _paragraphs(create_consolidated_report_from_files(reports)) == expected
@@ -0,0 +1,90 @@
+import json
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from benchmarks.cohort import make_cohort
+from main import app
+from routes import reports
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    # A real server: the test client hands over a streamed body only once it is complete
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}"
+    subject_files, info = make_cohort(4, theory_subjects=2, lab_subjects=1, seed=1)
+    httpx.post(f"{url}/api/upload/subjects", files=[("files", (name, content)) for name, content in subject_files]).raise_for_status()
+    httpx.post(f"{url}/api/upload/student-info", files={"file": ("info.xlsx", info)}).raise_for_status()
+    yield url
+    server.should_exit = True
+    thread.join()
+
+
+def _events(response):
+    event = None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
+
+def test_first_report_arrives_before_the_batch_finishes(base_url, monkeypatch):
+    # Reports after the first are held back until the client has seen the first event
+    first_seen = threading.Event()
+    rendered = []
+    render = reports.render_report_timed
+
+    def held_render(layout):
+        if rendered:
+            first_seen.wait(10)
+        rendered.append(layout)
+        return render(layout)
+
+    monkeypatch.setattr(reports, "render_report_timed", held_render)
+
+    events = []
+    with httpx.stream("GET", f"{base_url}/api/reports/generate/stream", params={"report_date": "01.07.2025"},
+                      headers={"Accept-Encoding": "gzip"}, timeout=30) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "content-encoding" not in response.headers
+        for event, data in _events(response):
+            if event == "report" and not first_seen.is_set():
+                # Only one report rendered yet: the event was not held until the end
+                assert len(rendered) == 1
+                first_seen.set()
+            events.append((event, data))
+
+    names = [event for event, _ in events]
+    assert names[0] == "queued" and names[-1] == "done"
+    student_events = [data for event, data in events if event == "report"]
+    assert len(student_events) == 4
+    assert all(data["render_ms"] > 0 and not data["reused"] for data in student_events)
+    assert httpx.get(base_url + student_events[0]["download_url"]).status_code == 200
+    done = events[-1][1]
+    assert done["total_generated"] == 4
+    assert done["elapsed_ms"] >= done["timings"]["total_ms"]
+
+
+def test_reused_reports_have_no_render_time(base_url):
+    with httpx.stream("GET", f"{base_url}/api/reports/generate/stream", params={"report_date": "01.07.2025"},
+                      timeout=30) as response:
+        events = list(_events(response))
+    student_events = [data for event, data in events if event == "report"]
+    assert student_events and all(data["reused"] and data["render_ms"] is None for data in student_events)
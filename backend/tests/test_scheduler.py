@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from services.scheduler import GenerationScheduler, SchedulerFull
+
+
+def test_identical_request_after_completion_starts_a_new_job():
+    scheduler = GenerationScheduler(max_running=1, max_queued=1)
+    runs = []
+    first, deduplicated = scheduler.submit("key", "s1", lambda: runs.append(1) or len(runs))
+    assert not deduplicated
+    assert first.future.result(timeout=5) == 1
+
+    second, deduplicated = scheduler.submit("key", "s1", lambda: runs.append(2) or len(runs))
+    assert not deduplicated
+    assert second.id != first.id
+    assert second.future.result(timeout=5) == 2
+
+
+def test_identical_request_while_running_shares_the_job():
+    scheduler = GenerationScheduler(max_running=1, max_queued=1)
+    release = threading.Event()
+    first, _ = scheduler.submit("key", "s1", lambda: release.wait(5) and "done")
+    second, deduplicated = scheduler.submit("key", "s2", lambda: "other")
+    release.set()
+    assert deduplicated
+    assert second is first
+    assert second.future.result(timeout=5) == "done"
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = GenerationScheduler(max_running=1, max_queued=1)
+    release = threading.Event()
+    scheduler.submit("a", "s1", lambda: release.wait(5))
+    scheduler.submit("b", "s1", lambda: None)
+    with pytest.raises(SchedulerFull) as rejected:
+        scheduler.submit("c", "s2", lambda: None)
+    release.set()
+    assert rejected.value.retry_after >= 1
+
+
+def test_failed_job_is_retired_before_its_error_is_raised():
+    scheduler = GenerationScheduler(max_running=1, max_queued=0)
+
+    def fail():
+        raise ValueError("boom")
+
+    job, _ = scheduler.submit("key", "s1", fail)
+    with pytest.raises(ValueError):
+        job.future.result(timeout=5)
+    assert scheduler.status()["running"] == 0
+    assert not scheduler.submit("key", "s1", lambda: None)[1]
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { previewApi } from "@/lib/api";
+import { previewApi, columnsToRecords } from "@/lib/api";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import {
@@ -19,6 +19,10 @@ interface SubjectData {
     records: Record<string, unknown>[];
     columns: string[];
     row_count: number;
+    filtered_count: number;
+    page: number;
+    page_size: number;
+    total_pages: number;
     is_lab: boolean;
 }
 
@@ -27,7 +31,6 @@ export default function PreviewPage() {
         subjects: Record<string, SubjectData>;
         total_subjects: number;
         total_students: number;
-        all_students: string[];
     } | null>(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
@@ -35,7 +38,14 @@ export default function PreviewPage() {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const result = await previewApi.getSubjects();
+                const result = await previewApi.getSubjects({
+                    page_size: 50,
+                    include_students: false,
+                    shape: "columns",
+                });
+                for (const subject of Object.values(result.subjects) as (SubjectData & { column_values: unknown[][] })[]) {
+                    subject.records = columnsToRecords(subject.columns, subject.column_values);
+                }
                 setData(result);
             } catch (err) {
                 setError(
@@ -169,7 +179,7 @@ export default function PreviewPage() {
                                             </TableRow>
                                         </TableHeader>
                                         <TableBody>
-                                            {subject.records.slice(0, 50).map((record, idx) => (
+                                            {subject.records.map((record, idx) => (
                                                 <TableRow key={idx}>
                                                     {subject.columns.map((col) => (
                                                         <TableCell key={col} className="whitespace-nowrap">
@@ -181,9 +191,9 @@ export default function PreviewPage() {
                                         </TableBody>
                                     </Table>
                                 </div>
-                                {subject.row_count > 50 && (
+                                {subject.row_count > subject.records.length && (
                                     <p className="text-sm text-muted-foreground mt-4 text-center">
-                                        Showing first 50 of {subject.row_count} records
+                                        Showing first {subject.records.length} of {subject.row_count} records
                                     </p>
                                 )}
                             </CardContent>
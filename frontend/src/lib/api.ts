@@ -44,9 +44,38 @@ export const uploadApi = {
 };
 
 // Preview API
+export interface SubjectPageParams {
+    page?: number;
+    page_size?: number;
+    columns?: string;
+    sort_by?: string;
+    descending?: boolean;
+    search?: string;
+    shape?: 'records' | 'columns';
+}
+
+// Rebuild row records from the compact columnar shape (shape: 'columns')
+export const columnsToRecords = (columns: string[], columnValues: unknown[][]) => {
+    const rowCount = columnValues[0]?.length ?? 0;
+    const records: Record<string, unknown>[] = [];
+    for (let row = 0; row < rowCount; row++) {
+        const record: Record<string, unknown> = {};
+        columns.forEach((col, i) => {
+            record[col] = columnValues[i][row];
+        });
+        records.push(record);
+    }
+    return records;
+};
+
 export const previewApi = {
-    getSubjects: async () => {
-        const response = await api.get('/api/preview/subjects');
+    getSubjects: async (params?: SubjectPageParams & { include_students?: boolean }) => {
+        const response = await api.get('/api/preview/subjects', { params });
+        return response.data;
+    },
+
+    getSubjectPage: async (subject: string, params?: SubjectPageParams) => {
+        const response = await api.get(`/api/preview/subjects/${encodeURIComponent(subject)}`, { params });
         return response.data;
     },
 